@@ -11,10 +11,10 @@ setup(name='tictactoe',
       author_email='spannbaueradam@gmail.com',
       url='https://github.com/AdamSpannbauer/tictactoe',
       packages=['tictactoe'],
+      package_data={'tictactoe': ['cpu_policy.npy', 'cpu_sampling_tables.npz']},
       license='MIT',
       install_requires=[
-          'numpy',
-          'mgsub',
+          'numpy>=1.25',
           'tqdm',
       ],
       )
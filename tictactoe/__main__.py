@@ -5,11 +5,30 @@ ap = argparse.ArgumentParser()
 ap.add_argument('-d', '--cpu_difficulty', type=int, default=100,
                 help='Number in range [0, 100] to set CPU skill level.')
 ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
-                help="Path to pickled file to read/save for CPU's knowledge. Ignored if use_saved_knowledge==0")
+                help="Path to knowledge file (.tttk or pickled) to read/save for CPU's knowledge. "
+                     "Ignored if use_saved_knowledge==0")
 ap.add_argument('-s', '--use_saved_knowledge', type=int, default=1,
-                help='Should knowledge be read/saved to pickled file? (0 if not)')
+                help='Should knowledge be read/saved to knowledge file? (0 if not)')
 ap.add_argument('-t', '--train_n_games', type=int, default=0,
                 help='Number of games to add to CPU knowledge before playing User.')
+ap.add_argument('-a', '--auto_train', type=int, default=0,
+                help='Should CPU train until its play stops improving before playing User? (1 if so) '
+                     'If so, train_n_games is the max number of games to train.')
+ap.add_argument('-r', '--record_games', default=None,
+                help='Path to binary game record file to append training and User games to.')
+ap.add_argument('-p', '--policy_table', default=None,
+                help="Path to policy table (.npy) for CPU to pick moves from instead of its knowledge. "
+                     "'default' uses the table shipped with the package.")
+ap.add_argument('-l', '--online_learning', type=int, default=0,
+                help='Should CPU learn from games against User while playing? (1 if so)')
+ap.add_argument('-w', '--knowledge_deadline', type=float, default=None,
+                help='Max seconds a CPU move waits for knowledge still loading/training before moving randomly.')
+ap.add_argument('-m', '--compact_knowledge', type=int, default=0,
+                help='Should knowledge be loaded in a memory optimized form? (1 if so)')
+ap.add_argument('-f', '--smooth_difficulty', default='0',
+                help='Should CPU sample moves from per difficulty tables instead of mixing in random moves? '
+                     "(1 to build them from knowledge, or path to saved tables (.npz); "
+                     "'default' uses the tables shipped with the package)")
 ap.add_argument('-c', '--cli', type=int, default=1,
                 help='Should CLI be used? (0 if not)')
 args = vars(ap.parse_args())
@@ -21,4 +40,11 @@ ttt.play(cpu_difficulty=args['cpu_difficulty'],
          use_saved_knowledge=use_saved_knowledge,
          knowledge=args['knowledge'],
          train_n_games=args['train_n_games'],
-         cli=use_cli)
+         cli=use_cli,
+         record_games=args['record_games'],
+         policy_table=args['policy_table'],
+         online_learning=args['online_learning'] != 0,
+         auto_train=args['auto_train'] != 0,
+         knowledge_deadline=args['knowledge_deadline'],
+         compact_knowledge=args['compact_knowledge'] != 0,
+         smooth_difficulty={'0': False, '1': True}.get(args['smooth_difficulty'], args['smooth_difficulty']))
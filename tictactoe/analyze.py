@@ -0,0 +1,124 @@
+import numpy as np
+from .knowledge_io import graph_to_edges
+from .policy_table import move_values as solver_move_values
+
+# Digits of every board code; row i is the board for `code_to_board(i)` as ints
+_DIGITS = (np.arange(3 ** 9)[:, None] // 3 ** np.arange(8, -1, -1)) % 3
+
+
+def _first_per_node(order, nodes):
+    """Pick the first edge index of each node from edge indices grouped by node"""
+    if not len(order):
+        return order
+
+    grouped = nodes[order]
+    return order[np.r_[True, grouped[1:] != grouped[:-1]]]
+
+
+def analyze_knowledge(cpu_knowledge):
+    """Compute coverage and quality statistics for CPU knowledge
+
+    Every statistic is computed with vectorized passes over all edges.
+    Positions are the non-terminal positions reachable in a legal game (4,520 in total).
+
+    :param cpu_knowledge: Graph of CPU knowledge
+    :return: dict of statistics
+
+    >>> from tictactoe.graph import Graph
+    >>> graph = Graph()
+    >>> graph.add_nodes(['000000000'], [{'000010000': 5, '000000001': -5}])
+    >>> stats = analyze_knowledge(graph)
+    >>> stats['n_positions_covered'], stats['optimal_top_move_rate']
+    (1, 1.0)
+    """
+    edges = graph_to_edges(cpu_knowledge)
+    move_values = solver_move_values()
+    reachable = ~np.isnan(move_values).all(axis=1)
+    n_reachable = int(reachable.sum())
+    depth = (_DIGITS != 0).sum(axis=1)
+
+    # Knowledge nodes are second person (mover is 2) and edges first person (mover is 1),
+    # so a legal edge inverted is its node with a single open cell filled by a 2
+    node_digits = _DIGITS[edges['node']]
+    edge_digits = (3 - _DIGITS[edges['edge']]) % 3
+    changed = node_digits != edge_digits
+    cells = changed.argmax(axis=1)
+    rows = np.arange(len(edges))
+    is_legal = (changed.sum(axis=1) == 1) & (node_digits[rows, cells] == 0) & (edge_digits[rows, cells] == 2)
+
+    # Rank each node's edges by weight (highest first) and take the first of each node
+    order = np.lexsort((-edges['weight'], edges['node']))
+    top = _first_per_node(order, edges['node'])
+    node_codes = edges['node'][top]
+    node_reachable = reachable[node_codes]
+    only_negative = edges['weight'][top] < 0
+
+    # Best move CPU would actually play is the highest weighted legal edge
+    legal_top = _first_per_node(order[is_legal[order]], edges['node'])
+    legal_top = legal_top[reachable[edges['node'][legal_top]]]
+    played_values = move_values[edges['node'][legal_top], cells[legal_top]]
+    best_values = np.nanmax(move_values[edges['node'][legal_top]], axis=1) if len(legal_top) else played_values
+    n_scored = len(legal_top)
+
+    covered = np.zeros(3 ** 9, dtype=bool)
+    covered[node_codes[node_reachable]] = True
+    coverage_by_depth = {}
+    for d in range(9):
+        at_depth = reachable & (depth == d)
+        coverage_by_depth[d] = float(covered[at_depth].sum() / at_depth.sum())
+
+    n_covered = int(node_reachable.sum())
+    return {
+        'n_nodes': len(cpu_knowledge.nodes),
+        'n_edges': len(edges),
+        'n_reachable_positions': n_reachable,
+        'n_positions_covered': n_covered,
+        'coverage': n_covered / n_reachable,
+        'coverage_by_n_pieces': coverage_by_depth,
+        'n_unreachable_nodes': int((~node_reachable).sum()),
+        'n_illegal_edges': int((~is_legal).sum()),
+        'n_only_negative_positions': int((only_negative & node_reachable).sum()),
+        'only_negative_rate': float((only_negative & node_reachable).sum() / n_covered) if n_covered else 0.0,
+        'top_move_illegal_rate': float((~is_legal[top][node_reachable]).sum() / n_covered) if n_covered else 0.0,
+        'optimal_top_move_rate': float((played_values == best_values).sum() / n_scored) if n_scored else 0.0,
+        'mean_top_move_regret': float((best_values - played_values).mean()) if n_scored else 0.0,
+        'n_suboptimal_top_moves': int((played_values < best_values).sum()),
+    }
+
+
+def format_report(stats):
+    """Format output of `analyze_knowledge()` as a readable report"""
+    lines = [
+        f"Nodes: {stats['n_nodes']}  Edges: {stats['n_edges']}",
+        f"Coverage: {stats['n_positions_covered']}/{stats['n_reachable_positions']} "
+        f"reachable positions ({stats['coverage']:.1%})",
+        'Coverage by pieces on board: ' + '  '.join(f'{d}: {c:.0%}'
+                                                     for d, c in stats['coverage_by_n_pieces'].items()),
+        f"Unreachable nodes: {stats['n_unreachable_nodes']}  Illegal edges: {stats['n_illegal_edges']}",
+        f"Positions with only negative edges: {stats['n_only_negative_positions']} "
+        f"({stats['only_negative_rate']:.1%})",
+        f"Top move illegal: {stats['top_move_illegal_rate']:.1%}",
+        f"Best known move is optimal: {stats['optimal_top_move_rate']:.1%} "
+        f"(mean regret {stats['mean_top_move_regret']:.3f}, {stats['n_suboptimal_top_moves']} suboptimal)",
+    ]
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from .knowledge_io import load_knowledge
+
+    ap = argparse.ArgumentParser(description="Report coverage and quality of CPU's knowledge.")
+    ap.add_argument('knowledge', nargs='?', default='cpu_knowledge.pickle',
+                    help='Path to knowledge file (.tttk or pickled).')
+    ap.add_argument('-j', '--json', default=None,
+                    help='Path to write statistics to as JSON.')
+    args = vars(ap.parse_args())
+
+    knowledge_stats = analyze_knowledge(load_knowledge(args['knowledge']))
+    print(format_report(knowledge_stats))
+
+    if args['json'] is not None:
+        with open(args['json'], 'w') as f:
+            json.dump(knowledge_stats, f, indent=2)
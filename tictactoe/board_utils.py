@@ -1,4 +1,4 @@
-from mgsub import mgsub
+_invert_table = str.maketrans('12', '21')
 
 
 def flatten_board(self):
@@ -22,7 +22,7 @@ def invert_board(flat_board):
     >>> invert_board('110200000')
     '220100000'
     """
-    return mgsub([flat_board], ['1', '2'], ['2', '1'])[0]
+    return flat_board.translate(_invert_table)
 
 
 def first_person_board(flat_board, piece_value=1):
@@ -93,3 +93,30 @@ def board_diff(prev, cur):
                 return col, row
             else:
                 i += 1
+
+
+def board_to_code(flat_board):
+    """Convert flat board str to an int by reading it as a base 3 number
+
+    Every board maps to a unique int in range [0, 3 ** 9) so boards can index dense arrays.
+
+    >>> board_to_code('000000000')
+    0
+    >>> board_to_code('000000012')
+    5
+    """
+    return int(flat_board, 3)
+
+
+def code_to_board(code):
+    """Convert int created by `board_to_code()` back to a flat board str
+
+    >>> code_to_board(5)
+    '000000012'
+    """
+    digits = []
+    for _ in range(9):
+        code, digit = divmod(code, 3)
+        digits.append(str(digit))
+
+    return ''.join(reversed(digits))
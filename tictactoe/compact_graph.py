@@ -0,0 +1,177 @@
+import sys
+import threading
+from types import MappingProxyType
+from array import array
+import numpy as np
+from .graph import Graph
+
+# Edge names are stored as ids into this table so each distinct name is only stored once.
+# Shared by every CompactNode; only grows (bounded by the 19,683 possible boards for CPU knowledge).
+# Nodes are created from background threads (knowledge loading, online learning), so adding names is locked.
+_names = []
+_name_ids = {}
+_names_lock = threading.Lock()
+
+
+def _intern(name):
+    """Get id of name in the shared name table (adding it if new)"""
+    try:
+        return _name_ids[name]
+    except KeyError:
+        pass
+
+    with _names_lock:
+        # Another thread may have added name while waiting for the lock
+        if name not in _name_ids:
+            if isinstance(name, str):
+                name = sys.intern(name)
+            _names.append(name)
+            _name_ids[name] = len(_names) - 1
+
+        return _name_ids[name]
+
+
+class CompactNode:
+    """Memory optimized drop in for Node
+
+    Uses `__slots__` instead of a per-instance `__dict__`, stores edge names as ids into a
+    shared table of interned names, and stores weights in a typed array of floats.
+
+    `edges` is a read-only mapping built on access, so edits must be made with `add_connections()`,
+    `remove_connections()`, or by assigning a new dict to `edges`.
+
+    :param name: name of node (must be a data type allowed to be a dict key)
+    :param edges: dictionary of 'edges' of format `{node_name: edge_weight}`
+
+    >>> a = CompactNode('a', edges={'b': 4})
+    >>> a
+    <Node with 1 edges>
+    >>> dict(a.edges)
+    {'b': 4.0}
+    >>> a.add_connections(['b', 'c'], weights=[2, 1], on_conflict=sum)
+    >>> dict(a.edges)
+    {'b': 6.0, 'c': 1.0}
+    >>> a.edges['b'] = 0
+    Traceback (most recent call last):
+    TypeError: 'mappingproxy' object does not support item assignment
+    """
+    __slots__ = ('name', '_keys', '_weights')
+
+    def __init__(self, name, edges=None):
+        self.name = sys.intern(name) if isinstance(name, str) else name
+        self.edges = {} if edges is None else edges
+
+    def __repr__(self):
+        return f'<Node with {len(self._keys)} edges>'
+
+    def __str__(self):
+        return f'Name: {self.name}\nConnections: {dict(self.edges)}'
+
+    def __getstate__(self):
+        # Ids are only meaningful to this process's name table, so pickle names
+        return self.name, [_names[k] for k in self._keys], self._weights
+
+    def __setstate__(self, state):
+        name, edge_names, weights = state
+        self.name = sys.intern(name) if isinstance(name, str) else name
+        self._keys = array('I', [_intern(n) for n in edge_names])
+        self._weights = weights
+
+    @property
+    def edges(self):
+        return MappingProxyType(dict(zip([_names[k] for k in self._keys], self._weights)))
+
+    @edges.setter
+    def edges(self, edges):
+        self._keys = array('I', [_intern(n) for n in edges.keys()])
+        self._weights = array('d', edges.values())
+
+    def add_connections(self, names, weights=None, on_conflict=np.mean):
+        """Add connections to other Nodes; see `Node.add_connections()`"""
+        if weights is None:
+            weights = [0 for _ in names]
+
+        for name, weight in zip(names, weights):
+            key = _intern(name)
+            try:
+                i = self._keys.index(key)
+            except ValueError:
+                self._keys.append(key)
+                self._weights.append(weight)
+                continue
+
+            if on_conflict == 'overwrite':
+                self._weights[i] = weight
+            elif callable(on_conflict):
+                self._weights[i] = on_conflict([self._weights[i], weight])
+            else:
+                raise KeyError('Connection already exists')
+
+    def remove_connections(self, names):
+        """Remove connections from edges by list of names; see `Node.remove_connections()`"""
+        for name in names:
+            key = _name_ids.get(name)
+            if key in self._keys:
+                i = self._keys.index(key)
+                del self._keys[i]
+                del self._weights[i]
+
+
+class CompactGraph(Graph):
+    """Memory optimized drop in for Graph made of CompactNode objects
+
+    >>> graph = CompactGraph()
+    >>> graph.add_nodes(['a', 'b'], edges=[{'b': 5}, {}])
+    >>> other = Graph()
+    >>> other.add_nodes(['a', 'c'], edges=[{'b': 3}, {}])
+    >>> graph.merge(other)
+    >>> dict(graph.nodes['a'].edges)
+    {'b': 8.0}
+    >>> type(graph.nodes['c']).__name__
+    'CompactNode'
+    >>> graph.set_all_weights(-1)
+    >>> dict(graph.nodes['a'].edges)
+    {'b': -1.0}
+    >>> plain = Graph()
+    >>> plain.merge(graph)
+    >>> plain.set_all_weights(5)
+    >>> dict(plain.nodes['a'].edges)
+    {'b': 5.0}
+    """
+    node_class = CompactNode
+
+    def __repr__(self):
+        return f'<CompactGraph with {len(self.nodes)} nodes>'
+
+    def add_nodes(self, names, edges=None):
+        """Add CompactNode objects and edges to graph; see `Graph.add_nodes()`"""
+        names = [sys.intern(n) if isinstance(n, str) else n for n in names]
+        super().add_nodes(names, edges)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Create a CompactGraph with the same nodes and edges as a Graph"""
+        compact = cls()
+        compact.add_nodes(list(graph.nodes.keys()), [node.edges for node in graph.nodes.values()])
+        compact.edge_counts = dict(graph.edge_counts)
+        return compact
+
+    def merge(self, graph, agg_fun=sum):
+        """Add the nodes & edges of another Graph object; see `Graph.merge()`
+
+        Unlike `Graph.merge()`, nodes missing from this graph are copied rather than shared.
+        """
+        for k, node in graph.nodes.items():
+            if k in self.nodes:
+                edges = node.edges
+                self.nodes[k].add_connections(edges.keys(), weights=edges.values(), on_conflict=agg_fun)
+            else:
+                self.add_nodes([k], [node.edges])
+
+        for key, count in graph.edge_counts.items():
+            self.edge_counts[key] = self.edge_counts.get(key, 0) + count
+
+    def set_all_weights(self, value):
+        """Set every edge weight in the graph to a certain value; see `Graph.set_all_weights()`"""
+        for node in self.nodes.values():
+            node._weights = array('d', [value] * len(node._keys))
@@ -0,0 +1,303 @@
+import socket
+import socketserver
+import struct
+import threading
+import time
+from multiprocessing import Process
+from .graph import Graph
+from .game_record import GameRecordBuffer, knowledge_from_records
+from .knowledge_io import graph_to_edges, edges_to_graph, encode_edges, decode_edges, load_knowledge, save_knowledge
+from .parallel import self_play_games
+from .random_stream import RandomStream
+
+# Message header: payload length and message type
+_HEADER = struct.Struct('<IB')
+# Delta message: snapshot version worker trained from, number of games,
+# seconds worker's previous push took to be answered (negative if none)
+_DELTA = struct.Struct('<IId')
+# Snapshot message: snapshot version
+_SNAPSHOT = struct.Struct('<I')
+
+_MSG_DELTA = 1
+_MSG_SNAPSHOT = 2
+
+
+def _send(sock, msg_type, payload):
+    sock.sendall(_HEADER.pack(len(payload), msg_type) + payload)
+
+
+def _recv_exact(sock, n_bytes):
+    data = bytearray()
+    while len(data) < n_bytes:
+        chunk = sock.recv(n_bytes - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed mid message.')
+        data += chunk
+
+    return bytes(data)
+
+
+def _recv(sock):
+    """Receive a message; returns (None, None) if connection is closed cleanly"""
+    header = sock.recv(_HEADER.size, socket.MSG_WAITALL)
+    if not header:
+        return None, None
+
+    if len(header) < _HEADER.size:
+        header += _recv_exact(sock, _HEADER.size - len(header))
+
+    n_bytes, msg_type = _HEADER.unpack(header)
+    return msg_type, _recv_exact(sock, n_bytes)
+
+
+class _CoordinatorHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        while True:
+            msg_type, payload = _recv(self.request)
+            if msg_type is None:
+                break
+
+            if msg_type != _MSG_DELTA:
+                raise ValueError(f'Unexpected message type {msg_type}.')
+
+            worker_version, n_games, round_trip = _DELTA.unpack_from(payload)
+            delta = edges_to_graph(decode_edges(payload[_DELTA.size:]))
+            version, snapshot = coordinator.merge(delta, n_games, worker_version, round_trip)
+
+            _send(self.request, _MSG_SNAPSHOT, _SNAPSHOT.pack(version) + snapshot)
+
+
+class Coordinator:
+    """Merge knowledge deltas pushed by training workers over TCP
+
+    Each delta is merged into `cpu_knowledge` with `Graph.merge` (weights are summed)
+    and answered with a versioned snapshot of the merged knowledge.
+
+    Snapshots are pulled on push: a worker only gets a new snapshot in reply to its own delta,
+    nothing is sent to idle workers.  Encoding a snapshot walks the whole graph, so it is only
+    rebuilt once every `snapshot_every` merges and replies may be up to that many versions behind.
+
+    :param cpu_knowledge: Graph of knowledge to start from and merge into
+    :param host: host to listen on
+    :param port: port to listen on; 0 picks a free port
+    :param snapshot_every: number of merges between rebuilding the snapshot sent to workers
+    :ivar version: number of deltas merged
+    :ivar address: (host, port) being listened on
+    """
+    def __init__(self, cpu_knowledge=None, host='localhost', port=0, snapshot_every=4):
+        self.cpu_knowledge = Graph() if cpu_knowledge is None else cpu_knowledge
+        self.version = 0
+        self.n_games = 0
+        self.snapshot_every = snapshot_every
+        self.round_trips = []
+        self.merge_seconds = []
+        self.version_lags = []
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_version = None
+        self._start_time = None
+
+        self._server = socketserver.ThreadingTCPServer((host, port), _CoordinatorHandler, bind_and_activate=True)
+        self._server.daemon_threads = True
+        self._server.coordinator = self
+        self.address = self._server.server_address
+        self._thread = None
+
+    def __repr__(self):
+        return f'<Coordinator at version {self.version} with {self.n_games} games>'
+
+    def start(self):
+        """Serve workers in a background thread
+
+        :return: self
+        """
+        self._start_time = time.time()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving workers
+
+        :return: merged Graph of knowledge
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+        return self.cpu_knowledge
+
+    def merge(self, delta, n_games, worker_version, round_trip=-1.0):
+        """Merge a worker's delta and return encoded snapshot
+
+        :param round_trip: seconds the worker's previous push took to be answered (negative if none)
+        :return: tuple of (snapshot version, snapshot bytes)
+        """
+        with self._lock:
+            start = time.perf_counter()
+            self.cpu_knowledge.merge(delta)
+            self.n_games += n_games
+            self.version_lags.append(self.version - worker_version)
+            self.version += 1
+            if round_trip >= 0:
+                self.round_trips.append(round_trip)
+
+            if self._snapshot is None or self.version - self._snapshot_version >= self.snapshot_every:
+                self._snapshot = encode_edges(graph_to_edges(self.cpu_knowledge))
+                self._snapshot_version = self.version
+
+            self.merge_seconds.append(time.perf_counter() - start)
+            return self._snapshot_version, self._snapshot
+
+    def stats(self):
+        """Summarize training throughput
+
+        :return: dict with total games, aggregate games per second, and merge lag
+                 (seconds from a worker sending a delta to getting a snapshot back, timed by the worker;
+                 seconds the coordinator spent merging a delta; and number of versions merged since
+                 the worker's snapshot)
+        """
+        elapsed = time.time() - self._start_time if self._start_time else 0
+        n_merges = len(self.merge_seconds)
+        n_round_trips = len(self.round_trips)
+        return {
+            'version': self.version,
+            'n_games': self.n_games,
+            'games_per_second': self.n_games / elapsed if elapsed else 0,
+            'mean_round_trip': sum(self.round_trips) / n_round_trips if n_round_trips else 0,
+            'max_round_trip': max(self.round_trips, default=0),
+            'mean_merge_seconds': sum(self.merge_seconds) / n_merges if n_merges else 0,
+            'mean_version_lag': sum(self.version_lags) / n_merges if n_merges else 0,
+        }
+
+
+def run_worker(address, n_games, games_per_delta=500, rng=None, random_move_percent=0.25):
+    """Run self-play and push knowledge deltas to a Coordinator
+
+    After each delta the worker continues training from the snapshot sent back by the coordinator.
+
+    :param address: (host, port) of Coordinator
+    :param n_games: total number of games for worker to play
+    :param games_per_delta: number of games to play between pushes
+    :param rng: RandomStream (or seed for one) to draw random moves from
+    :param random_move_percent: chance for CPU to make random choice rather than best known choice
+    :return: None
+    """
+    if not isinstance(rng, RandomStream):
+        rng = RandomStream(rng)
+
+    cpu_knowledge = Graph()
+    version = 0
+    played = 0
+    round_trip = -1.0
+    with socket.create_connection(address) as sock:
+        while played < n_games:
+            n = min(games_per_delta, n_games - played)
+            records = self_play_games(n, rng, cpu_knowledge, random_move_percent)
+            delta = knowledge_from_records(GameRecordBuffer(records))
+            played += n
+
+            payload = _DELTA.pack(version, n, round_trip) + encode_edges(graph_to_edges(delta))
+            sent = time.perf_counter()
+            _send(sock, _MSG_DELTA, payload)
+
+            msg_type, payload = _recv(sock)
+            round_trip = time.perf_counter() - sent
+            if msg_type != _MSG_SNAPSHOT:
+                raise ConnectionError('Coordinator did not reply with a snapshot.')
+
+            version, = _SNAPSHOT.unpack_from(payload)
+            cpu_knowledge = edges_to_graph(decode_edges(payload[_SNAPSHOT.size:]))
+
+
+def run_local(n_workers=4, n_games=10000, games_per_delta=500, seed=None,
+              cpu_knowledge=None, random_move_percent=0.25):
+    """Run a Coordinator and worker processes on localhost
+
+    Worker processes stand in for training hosts; each gets a RandomStream spawned from `seed`.
+
+    :param n_workers: number of worker processes
+    :param n_games: total number of games to play across all workers
+    :param games_per_delta: number of games each worker plays between pushes
+    :param seed: seed for RandomStream that worker streams are spawned from
+    :param cpu_knowledge: Graph of knowledge to start from and merge into
+    :param random_move_percent: chance for CPU to make random choice rather than best known choice
+    :return: tuple of (merged Graph of knowledge, `Coordinator.stats()` dict)
+
+    >>> knowledge, stats = run_local(2, 20, games_per_delta=10, seed=0)
+    >>> stats['n_games'], stats['version']
+    (20, 2)
+    """
+    coordinator = Coordinator(cpu_knowledge).start()
+
+    streams = RandomStream(seed).spawn(n_workers)
+    games_per_worker = [n_games // n_workers + (i < n_games % n_workers) for i in range(n_workers)]
+    workers = [Process(target=run_worker,
+                       args=(coordinator.address, n, games_per_delta, stream, random_move_percent))
+               for n, stream in zip(games_per_worker, streams)]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stats = coordinator.stats()
+    return coordinator.stop(), stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    ap = argparse.ArgumentParser(description='Pool self-play training across worker processes or hosts.')
+    ap.add_argument('mode', choices=['local', 'coordinator', 'worker'],
+                    help='Run coordinator and workers on localhost (local), or just one role.')
+    ap.add_argument('-a', '--address', default='localhost:5007',
+                    help='host:port for coordinator to listen on or worker to connect to.')
+    ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
+                    help="Path to knowledge file (.tttk or pickled) to read/save for CPU's knowledge "
+                         "(coordinator & local).")
+    ap.add_argument('-w', '--n_workers', type=int, default=4,
+                    help='Number of worker processes (local).')
+    ap.add_argument('-t', '--train_n_games', type=int, default=10000,
+                    help='Number of games to play (local: across all workers, worker: by this worker).')
+    ap.add_argument('-g', '--games_per_delta', type=int, default=500,
+                    help='Number of games each worker plays between pushes to coordinator.')
+    ap.add_argument('-s', '--seed', type=int, default=None,
+                    help='Seed for random streams.')
+    ap.add_argument('-i', '--worker_id', type=int, default=0,
+                    help='Index of this worker (worker); seeded workers need distinct ids to play different games.')
+    args = vars(ap.parse_args())
+
+    host, port = args['address'].rsplit(':', 1)
+    address = (host, int(port))
+
+    if args['mode'] == 'worker':
+        # Same stream worker `worker_id` gets from run_local
+        worker_rng = RandomStream(args['seed']).spawn(args['worker_id'] + 1)[-1]
+        run_worker(address, args['train_n_games'], args['games_per_delta'], worker_rng)
+    else:
+        knowledge = None
+        if os.path.exists(args['knowledge']):
+            knowledge = load_knowledge(args['knowledge'])
+
+        if args['mode'] == 'local':
+            knowledge, train_stats = run_local(args['n_workers'], args['train_n_games'],
+                                               args['games_per_delta'], args['seed'], knowledge)
+        else:
+            server = Coordinator(knowledge, host, address[1]).start()
+            print(f'Coordinator listening on {server.address}; Ctrl-C to stop and save.')
+            try:
+                while True:
+                    time.sleep(10)
+                    print(server.stats())
+            except KeyboardInterrupt:
+                pass
+            train_stats = server.stats()
+            knowledge = server.stop()
+
+        print(train_stats)
+        save_knowledge(knowledge, args['knowledge'])
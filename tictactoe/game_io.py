@@ -0,0 +1,81 @@
+import time
+
+
+class ConsoleIO:
+    """Game loop I/O through the terminal with input() and print()
+
+    :param turn_delay: seconds to pause after each turn is displayed
+    """
+    def __init__(self, turn_delay=0.3):
+        self.turn_delay = turn_delay
+
+    def __repr__(self):
+        return f'<ConsoleIO with {self.turn_delay}s turn delay>'
+
+    @staticmethod
+    def input(prompt):
+        return input(prompt)
+
+    @staticmethod
+    def output(text):
+        print(text)
+
+    def pause(self):
+        time.sleep(self.turn_delay)
+
+
+class ScriptedIO:
+    """Game loop I/O answered by a script instead of a User; nothing is displayed and turns never pause
+
+    Lets the CLI game loop (see `TicTacToe.play()`) run headlessly, e.g. for load testing.
+
+    :param answers: iterable of answers to prompts in order,
+                    or function taking a prompt and returning an answer
+    :param keep_transcript: Should prompts, answers and output be kept in the transcript attribute?
+    :param on_output: function called with each output (i.e. for a script to follow the game); None to ignore
+    :ivar n_prompts: number of prompts answered
+    :ivar n_outputs: number of outputs (displayed text) received
+
+    >>> io = ScriptedIO(['X'], keep_transcript=True)
+    >>> io.input('Which piece? ')
+    'X'
+    >>> io.output('X played:')
+    >>> io.transcript
+    ['Which piece? ', 'X', 'X played:']
+    """
+    def __init__(self, answers, keep_transcript=False, on_output=None):
+        if not callable(answers):
+            answers = iter(answers)
+            self._answer = lambda prompt: next(answers)
+        else:
+            self._answer = answers
+        self.keep_transcript = keep_transcript
+        self.on_output = on_output
+        self.transcript = []
+        self.n_prompts = 0
+        self.n_outputs = 0
+
+    def __repr__(self):
+        return f'<ScriptedIO with {self.n_prompts} prompts answered>'
+
+    def input(self, prompt):
+        try:
+            answer = self._answer(prompt)
+        except StopIteration:
+            raise EOFError(f'No scripted answer left for prompt: {prompt!r}')
+
+        self.n_prompts += 1
+        if self.keep_transcript:
+            self.transcript.extend([prompt, answer])
+
+        return answer
+
+    def output(self, text):
+        self.n_outputs += 1
+        if self.keep_transcript:
+            self.transcript.append(text)
+        if self.on_output is not None:
+            self.on_output(text)
+
+    def pause(self):
+        pass
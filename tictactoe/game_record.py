@@ -0,0 +1,301 @@
+import os
+import threading
+from collections import Counter
+from .board_utils import first_person_board, second_person_board
+from .graph import Graph
+
+# Every record file starts with this header so stray files are rejected early
+_MAGIC = b'TTTR\x01'
+
+
+def encode_game(moves, winner):
+    """Pack a finished game into a compact byte string
+
+    The first byte holds the number of moves (high nibble) and the winner (low nibble).
+    Moves are the flat board indices (0-8) of each placed piece in play order,
+    packed two per byte (first move of the pair in the high nibble).
+    A full 9 move game takes 6 bytes.
+
+    :param moves: list of flat board indices in the order they were played
+    :param winner: piece value of winner (0 for a tie)
+    :return: bytes
+
+    >>> encode_game([0, 4, 8], 1)
+    b'1\\x04\\x80'
+    >>> len(encode_game(list(range(9)), 1))
+    6
+    """
+    n_moves = len(moves)
+    padded = list(moves) + [0] * (n_moves % 2)
+    packed = [(padded[i] << 4) | padded[i + 1] for i in range(0, n_moves, 2)]
+
+    return bytes([(n_moves << 4) | int(winner)] + packed)
+
+
+def decode_game(record):
+    """Unpack a byte string created by `encode_game()`
+
+    :param record: bytes of a single encoded game
+    :return: tuple of (moves, winner) where moves is a tuple of flat board indices
+
+    >>> decode_game(encode_game([0, 4, 8], 1))
+    ((0, 4, 8), 1)
+    """
+    n_moves = record[0] >> 4
+    winner = record[0] & 0x0F
+    moves = []
+    for byte in record[1:]:
+        moves.extend((byte >> 4, byte & 0x0F))
+
+    return tuple(moves[:n_moves]), winner
+
+
+def _record_length(header_byte):
+    """Number of bytes used by a record given its first byte"""
+    return 1 + ((header_byte >> 4) + 1) // 2
+
+
+class GameRecordWriter:
+    """Append finished games to a binary game record file
+
+    Files are opened in append mode so several sessions can add to the same record.
+    Can be used as a context manager.
+
+    :param path: path of game record file to append to
+    :ivar n_games: number of games written by this writer
+    """
+    def __init__(self, path):
+        self.path = path
+        self.n_games = 0
+        # Games may be written from a training thread and the CLI at the same time
+        self._lock = threading.Lock()
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if is_new:
+            self._file.write(_MAGIC)
+
+    def __repr__(self):
+        return f'<GameRecordWriter with {self.n_games} games>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, moves, winner):
+        """Write a single finished game
+
+        :param moves: list of flat board indices in the order they were played
+        :param winner: piece value of winner (0 for a tie)
+        :return: None
+        """
+        with self._lock:
+            self._file.write(encode_game(moves, winner))
+            self.n_games += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class GameRecordBuffer:
+    """Keep encoded games in memory; a stand in for GameRecordWriter
+
+    Useful for sending games between processes without touching disk.
+
+    :param data: bytes of concatenated encoded games (without file header) to start with
+    :ivar data: bytearray of concatenated encoded games
+
+    >>> buffer = GameRecordBuffer()
+    >>> buffer.write([0, 4, 8], 1)
+    >>> list(buffer)
+    [((0, 4, 8), 1)]
+    """
+    def __init__(self, data=b''):
+        self.data = bytearray(data)
+        self.n_games = 0
+
+    def __repr__(self):
+        return f'<GameRecordBuffer with {len(self.data)} bytes>'
+
+    def __iter__(self):
+        return iter_game_bytes(bytes(self.data))
+
+    def write(self, moves, winner):
+        self.data += encode_game(moves, winner)
+        self.n_games += 1
+
+    def close(self):
+        pass
+
+
+def iter_game_bytes(data):
+    """Decode games from bytes of concatenated encoded games (without file header)
+
+    :param data: bytes of concatenated encoded games
+    :return: generator of (moves, winner) tuples; see `decode_game()`
+    """
+    i = 0
+    n_bytes = len(data)
+    while i < n_bytes:
+        end = i + _record_length(data[i])
+        if end > n_bytes:
+            raise ValueError('Data ends with a truncated game record.')
+
+        yield decode_game(data[i:end])
+        i = end
+
+
+def iter_game_records(paths, chunk_size=1 << 20):
+    """Stream games from one or more game record files
+
+    Files are read `chunk_size` bytes at a time, so memory use does not grow with file size.
+
+    :param paths: path (or list of paths) to game record files
+    :param chunk_size: number of bytes to read from disk at a time
+    :return: generator of (moves, winner) tuples; see `decode_game()`
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f'{path} is not a game record file.')
+
+            buffer = b''
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+
+                buffer += chunk
+                i = 0
+                n_bytes = len(buffer)
+                while i < n_bytes:
+                    end = i + _record_length(buffer[i])
+                    if end > n_bytes:
+                        break
+                    yield decode_game(buffer[i:end])
+                    i = end
+
+                buffer = buffer[i:]
+
+            if buffer:
+                raise ValueError(f'{path} ends with a truncated game record.')
+
+
+def game_edges(moves, winner, win_weight=5, lose_weight=-5, tie_weight=0):
+    """Replay a game and generate the knowledge edges it teaches
+
+    Edges are in the same form `TicTacToe.train_cpu()` stores them:
+    the board before a move in second person and the board after the move in first person.
+
+    :param moves: flat board indices in the order they were played (X plays first)
+    :param winner: piece value of winner (0 for a tie)
+    :param win_weight: edge weight for moves made by the winner
+    :param lose_weight: edge weight for moves made by the loser
+    :param tie_weight: edge weight for moves made in a tied game
+    :return: generator of (node_name, edge_name, weight) tuples
+
+    >>> list(game_edges([0, 4], 0))
+    [('000000000', '100000000', 0), ('100000000', '200010000', 0)]
+    """
+    board = ['0'] * 9
+    player = 1
+    for move in moves:
+        prev = ''.join(board)
+        board[move] = str(player)
+        if not winner:
+            weight = tie_weight
+        elif player == winner:
+            weight = win_weight
+        else:
+            weight = lose_weight
+
+        yield second_person_board(prev, player), first_person_board(''.join(board), player), weight
+        player = 1 if player == 2 else 2
+
+
+def iter_record_edges(records, **weights):
+    """Generate knowledge edges for a stream of games
+
+    :param records: iterable of (moves, winner) tuples (i.e. from `iter_game_records()`)
+    :param weights: keyword arguments passed to `game_edges()`
+    :return: generator of (node_name, edge_name, weight) tuples
+    """
+    for moves, winner in records:
+        yield from game_edges(moves, winner, **weights)
+
+
+def knowledge_from_records(records, graph=None, **weights):
+    """Build (or add to) CPU knowledge from recorded games without replaying self-play
+
+    Identical games are only replayed once and their weights (and edge counts) are scaled by how many
+    times they occur.
+    Memory use is bounded by the number of distinct games (at most 255,168 in tic-tac-toe)
+    rather than the number of records.  Weights are combined with `sum` as in `TicTacToe.train_cpu()`.
+
+    :param records: iterable of (moves, winner) tuples or path(s) to game record files
+    :param graph: Graph to add knowledge to; if None a new Graph is created
+    :param weights: keyword arguments passed to `game_edges()` to re-weight the records
+    :return: Graph of knowledge
+
+    >>> graph = knowledge_from_records([((0, 4), 0), ((0, 4), 0), ((0, 3, 1, 4, 2), 1)])
+    >>> graph
+    <Graph with 5 nodes>
+    >>> graph.nodes['000000000'].edges
+    {'100000000': 5}
+    >>> graph.edge_counts['000000000', '100000000']
+    3
+    """
+    if isinstance(records, (str, os.PathLike)) or \
+            (isinstance(records, (list, tuple)) and records and isinstance(records[0], (str, os.PathLike))):
+        records = iter_game_records(records)
+
+    game_counts = Counter(records)
+
+    knowledge = {}
+    edge_counts = {}
+    for (moves, winner), count in game_counts.items():
+        for node, edge, weight in game_edges(moves, winner, **weights):
+            edges = knowledge.setdefault(node, {})
+            edges[edge] = edges.get(edge, 0) + weight * count
+            edge_counts[node, edge] = edge_counts.get((node, edge), 0) + count
+
+    new_graph = Graph()
+    new_graph.add_nodes(list(knowledge.keys()), list(knowledge.values()))
+    new_graph.edge_counts = edge_counts
+
+    if graph is None:
+        return new_graph
+
+    graph.merge(new_graph)
+    return graph
+
+
+if __name__ == '__main__':
+    import argparse
+    from .knowledge_io import save_knowledge
+
+    ap = argparse.ArgumentParser(description='Rebuild CPU knowledge from binary game record files.')
+    ap.add_argument('records', nargs='+',
+                    help='Path(s) to game record files.')
+    ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
+                    help="Path to save CPU's rebuilt knowledge to (binary if it ends in .tttk, else pickled).")
+    ap.add_argument('-w', '--win_weight', type=float, default=5,
+                    help='Edge weight for moves made by the winner.')
+    ap.add_argument('-l', '--lose_weight', type=float, default=-5,
+                    help='Edge weight for moves made by the loser.')
+    ap.add_argument('-t', '--tie_weight', type=float, default=0,
+                    help='Edge weight for moves made in a tied game.')
+    args = vars(ap.parse_args())
+
+    cpu_knowledge = knowledge_from_records(args['records'],
+                                           win_weight=args['win_weight'],
+                                           lose_weight=args['lose_weight'],
+                                           tie_weight=args['tie_weight'])
+    save_knowledge(cpu_knowledge, args['knowledge'])
+
+    print(f'Saved {cpu_knowledge} to {args["knowledge"]}')
@@ -5,12 +5,25 @@ from .node import Node
 class Graph:
     """Represent a 'graph' of Node objects
 
+    :ivar nodes: dict of `{node_name: Node}`
+    :ivar edge_counts: dict of `{(node_name, edge_name): count}` of how many times edges have been
+                       learned from (see `Graph.count_edges()`); edges without an entry have no known count
+
     >>> graph = Graph()
     >>> graph.nodes
     {}
     """
+    # Class used for nodes created by the graph
+    node_class = Node
+
     def __init__(self):
         self.nodes = {}
+        self.edge_counts = {}
+
+    def __setstate__(self, state):
+        # Graphs pickled before edge counts were kept
+        state.setdefault('edge_counts', {})
+        self.__dict__.update(state)
 
     def __repr__(self):
         return f'<Graph with {len(self.nodes)} nodes>'
@@ -76,10 +89,10 @@ class Graph:
         """
         if edges is not None:
             for n, e in zip(names, edges):
-                self.nodes[n] = Node(n, edges=e)
+                self.nodes[n] = self.node_class(n, edges=e)
         else:
             for n in names:
-                self.nodes[n] = Node(n)
+                self.nodes[n] = self.node_class(n)
 
     def remove_nodes(self, names, rm_edges=True):
         """Delete nodes from the graph
@@ -184,8 +197,26 @@ class Graph:
         {'a': <Node with 0 edges>, 'b': <Node with 0 edges>}
         """
         self.nodes[name_a].remove_connections([name_b])
+        self.edge_counts.pop((name_a, name_b), None)
         if bi_directional:
             self.nodes[name_b].remove_connections([name_a])
+            self.edge_counts.pop((name_b, name_a), None)
+
+    def count_edges(self, edges, n=1):
+        """Add to the number of times edges have been learned from
+
+        :param edges: iterable of (node_name, edge_name) tuples
+        :param n: number to add to each edge's count
+        :return: None; `edge_counts` attribute is modified
+
+        >>> graph = Graph()
+        >>> graph.count_edges([('a', 'b'), ('a', 'c')])
+        >>> graph.count_edges([('a', 'b')], n=2)
+        >>> graph.edge_counts
+        {('a', 'b'): 3, ('a', 'c'): 1}
+        """
+        for key in edges:
+            self.edge_counts[key] = self.edge_counts.get(key, 0) + n
 
     def merge(self, graph, agg_fun=sum):
         """Add the nodes & edges of another Graph object
@@ -195,7 +226,8 @@ class Graph:
                         Will be used to aggregate common edges between the 2 graphs.
                         For example, in graph 1 there exists A--5-->B and in graph 2 there exists A --3--> B.
                         If `sum` is the agg_fun, then the resulting merged graph will have A --8--> B.
-        :return: None; `nodes` attribute is modified
+                        Edge counts are always summed.
+        :return: None; `nodes` and `edge_counts` attributes are modified
 
         >>> graph_1 = Graph()
         >>> graph_2 = Graph()
@@ -218,6 +250,9 @@ class Graph:
         for k in missing_keys:
             self.nodes[k] = graph.nodes[k]
 
+        for key, count in graph.edge_counts.items():
+            self.edge_counts[key] = self.edge_counts.get(key, 0) + count
+
     def set_all_weights(self, value):
         """Set every edge weight in the graph to a certain value
 
@@ -236,10 +271,6 @@ class Graph:
         >>> graph.nodes['c'].edges
         {}
         """
-        for name, node in self.nodes.items():
-            edges = node.edges
-            node.edges = {}
-            for k in edges.keys():
-                node.edges[k] = value
-
-            self.nodes[name] = node
+        for node in self.nodes.values():
+            # Assign a new dict rather than edit in place so nodes building edges on access work too
+            node.edges = {k: value for k in node.edges.keys()}
@@ -0,0 +1,313 @@
+import os
+import heapq
+import pickle
+import tempfile
+from itertools import groupby
+import numpy as np
+from .board_utils import board_to_code, code_to_board
+from .graph import Graph
+from .compact_graph import CompactGraph
+
+# One row per edge; boards are stored as `board_to_code()` ints
+EDGE_DTYPE = np.dtype([('node', '<u2'), ('edge', '<u2'), ('weight', '<f8'), ('count', '<u4')])
+
+
+def graph_to_edges(graph):
+    """Convert a Graph of knowledge to a compact structured array of edges
+
+    Rows are sorted by node then edge.  Counts come from `Graph.edge_counts`;
+    edges without a known count are given a count of 0.
+
+    :param graph: Graph of knowledge (node and edge names must be flat board strs)
+    :return: numpy array with dtype `EDGE_DTYPE`
+
+    >>> graph = Graph()
+    >>> graph.add_nodes(['000000000'], [{'100000000': 5}])
+    >>> graph_to_edges(graph)['edge']
+    array([6561], dtype=uint16)
+    """
+    edge_counts = graph.edge_counts
+    node_codes, edge_codes, weights, counts = [], [], [], []
+    for name, node in graph.nodes.items():
+        node_code = board_to_code(name)
+        for edge, weight in node.edges.items():
+            node_codes.append(node_code)
+            edge_codes.append(board_to_code(edge))
+            weights.append(weight)
+            counts.append(edge_counts.get((name, edge), 0))
+
+    edges = np.zeros(len(weights), dtype=EDGE_DTYPE)
+    edges['node'] = node_codes
+    edges['edge'] = edge_codes
+    edges['weight'] = weights
+    edges['count'] = counts
+
+    return np.sort(edges, order=['node', 'edge'])
+
+
+def edges_to_graph(edges, graph_class=Graph):
+    """Convert a structured array of edges back to a Graph of knowledge
+
+    :param edges: numpy array with dtype `EDGE_DTYPE`
+    :param graph_class: Graph class to build (i.e. CompactGraph)
+    :return: Graph
+
+    >>> graph = Graph()
+    >>> graph.add_nodes(['000000000'], [{'100000000': 5}])
+    >>> graph.count_edges([('000000000', '100000000')], n=2)
+    >>> loaded = edges_to_graph(graph_to_edges(graph))
+    >>> loaded.nodes['000000000'].edges, loaded.edge_counts
+    ({'100000000': 5.0}, {('000000000', '100000000'): 2})
+    """
+    # Share one str per board between nodes, edges and counts
+    boards = {}
+
+    def board(code):
+        if code not in boards:
+            boards[code] = code_to_board(code)
+        return boards[code]
+
+    knowledge = {}
+    edge_counts = {}
+    for node_code, edge_code, weight, count in zip(edges['node'].tolist(), edges['edge'].tolist(),
+                                                   edges['weight'].tolist(), edges['count'].tolist()):
+        node, edge = board(node_code), board(edge_code)
+        knowledge.setdefault(node, {})[edge] = weight
+        if count:
+            edge_counts[node, edge] = count
+
+    graph = graph_class()
+    graph.add_nodes(list(knowledge.keys()), list(knowledge.values()))
+    graph.edge_counts = edge_counts
+
+    return graph
+
+
+def encode_edges(edges):
+    """Serialize structured array of edges to bytes"""
+    return np.ascontiguousarray(edges, dtype=EDGE_DTYPE).tobytes()
+
+
+def decode_edges(data):
+    """Deserialize bytes created by `encode_edges()`"""
+    return np.frombuffer(data, dtype=EDGE_DTYPE)
+
+
+# Knowledge files start with this header followed by `EDGE_DTYPE` rows sorted by node then edge
+_MAGIC = b'TTTK\x02'
+# Version 1 files wrote a count of 1 for every edge; their counts are read as unknown (0)
+_MAGIC_V1 = b'TTTK\x01'
+KNOWLEDGE_FILE_EXT = '.tttk'
+
+
+def _read_magic(f):
+    """Read knowledge file header; returns file version (None if not a knowledge file)"""
+    magic = f.read(len(_MAGIC))
+    if magic == _MAGIC:
+        return 2
+    if magic == _MAGIC_V1:
+        return 1
+
+    return None
+
+
+def _decode_file_edges(data, version):
+    edges = decode_edges(data)
+    if version == 1:
+        edges = edges.copy()
+        edges['count'] = 0
+
+    return edges
+
+
+def save_knowledge_file(knowledge, path):
+    """Write knowledge to a sorted binary knowledge file
+
+    :param knowledge: Graph or structured array of edges (sorted by node then edge)
+    :param path: path to write to
+    :return: None
+    """
+    edges = graph_to_edges(knowledge) if isinstance(knowledge, Graph) else knowledge
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(encode_edges(edges))
+
+
+def is_knowledge_file(path):
+    """Check if path is a binary knowledge file (rather than a pickled Graph)"""
+    with open(path, 'rb') as f:
+        return _read_magic(f) is not None
+
+
+def iter_knowledge_file(path, chunk_rows=1 << 16):
+    """Stream edges from a binary knowledge file in node then edge order
+
+    :param path: path to knowledge file
+    :param chunk_rows: number of edges to read from disk at a time
+    :return: generator of (node_code, edge_code, weight, count) tuples
+    """
+    with open(path, 'rb') as f:
+        version = _read_magic(f)
+        if version is None:
+            raise ValueError(f'{path} is not a knowledge file.')
+
+        while True:
+            data = f.read(chunk_rows * EDGE_DTYPE.itemsize)
+            if not data:
+                break
+
+            yield from _decode_file_edges(data, version).tolist()
+
+
+def load_knowledge(path, compact=False):
+    """Read CPU knowledge from a binary knowledge file or a pickled Graph
+
+    :param path: path to knowledge file
+    :param compact: Should knowledge be returned as a memory optimized CompactGraph?
+                    Binary knowledge files are read straight into one; a pickled Graph is
+                    converted after loading, so loading briefly holds both.
+    :return: Graph
+    """
+    with open(path, 'rb') as f:
+        version = _read_magic(f)
+        if version is not None:
+            graph = edges_to_graph(_decode_file_edges(f.read(), version), CompactGraph if compact else Graph)
+        else:
+            f.seek(0)
+            graph = pickle.load(f)
+
+    if compact and not isinstance(graph, CompactGraph):
+        graph = CompactGraph.from_graph(graph)
+
+    return graph
+
+
+def save_knowledge(graph, path):
+    """Write CPU knowledge as a binary knowledge file if path ends in '.tttk'; else pickle it
+
+    :param graph: Graph of knowledge
+    :param path: path to write to
+    :return: None
+    """
+    if path.endswith(KNOWLEDGE_FILE_EXT):
+        save_knowledge_file(graph, path)
+    else:
+        with open(path, 'wb') as f:
+            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _aggregate(rows, agg):
+    weights = [row[2] for row in rows]
+    count = sum(row[3] for row in rows)
+    if agg == 'sum':
+        weight = sum(weights)
+    elif agg == 'mean':
+        weight = sum(weights) / len(weights)
+    else:
+        if not all(row[3] for row in rows):
+            raise ValueError(f'Edge {code_to_board(rows[0][1])} of node {code_to_board(rows[0][0])} '
+                             "has no count; use 'mean' or 'sum' for knowledge without edge counts.")
+        weight = sum(row[2] * row[3] for row in rows) / count
+
+    return rows[0][0], rows[0][1], weight, count
+
+
+def merge_knowledge_files(paths, output, agg='sum', chunk_rows=1 << 16):
+    """Merge knowledge files by streaming them in node then edge order
+
+    At most `chunk_rows` edges per input (plus `chunk_rows` output edges) are held in memory at a time.
+    Pickled Graph inputs are converted to temporary knowledge files one at a time first.
+
+    :param paths: list of paths to knowledge files (binary knowledge files or pickled Graphs)
+    :param output: path of binary knowledge file to write
+    :param agg: how to combine an edge found in several files:
+                * 'sum' adds weights (as `Graph.merge` does by default)
+                * 'mean' averages weights of the files the edge is in
+                * 'count_weighted' averages weights weighted by each edge's count;
+                  raises ValueError if an input edge has no count (see `Graph.edge_counts`)
+                Counts are always summed.
+    :param chunk_rows: number of edges to read from each file (and write) at a time
+    :return: number of edges written
+
+    >>> import os, tempfile
+    >>> tmp = tempfile.mkdtemp()
+    >>> paths = [os.path.join(tmp, f'{i}.tttk') for i in range(3)]
+    >>> for i, path in enumerate(paths):
+    ...     graph = Graph()
+    ...     graph.add_nodes(['000000000'], [{'100000000': i, '010000000': 1}])
+    ...     save_knowledge_file(graph, path)
+    >>> merge_knowledge_files(paths, os.path.join(tmp, 'merged.tttk'), agg='mean')
+    2
+    >>> list(iter_knowledge_file(os.path.join(tmp, 'merged.tttk')))
+    [(0, 2187, 1.0, 0), (0, 6561, 1.0, 0)]
+
+    With edge counts (i.e. from `game_record.knowledge_from_records()`), 'count_weighted'
+    gives inputs learned from more games more say:
+
+    >>> from tictactoe.game_record import knowledge_from_records
+    >>> save_knowledge_file(knowledge_from_records([((0, 3, 1, 4, 2), 1)] * 3), paths[0])
+    >>> save_knowledge_file(knowledge_from_records([((0, 1, 3, 4, 6), 2)]), paths[1])
+    >>> for agg in ('mean', 'count_weighted'):
+    ...     _ = merge_knowledge_files(paths[:2], os.path.join(tmp, 'merged.tttk'), agg=agg)
+    ...     print(agg, next(iter_knowledge_file(os.path.join(tmp, 'merged.tttk'))))
+    mean (0, 6561, 5.0, 4)
+    count_weighted (0, 6561, 10.0, 4)
+    >>> merge_knowledge_files(paths, os.path.join(tmp, 'merged.tttk'), agg='count_weighted')
+    Traceback (most recent call last):
+    ValueError: Edge 010000000 of node 000000000 has no count; use 'mean' or 'sum' for knowledge without edge counts.
+    """
+    if agg not in ('sum', 'mean', 'count_weighted'):
+        raise ValueError("agg must be 'sum', 'mean', or 'count_weighted'")
+
+    temp_paths = []
+    try:
+        file_paths = []
+        for path in paths:
+            if is_knowledge_file(path):
+                file_paths.append(path)
+            else:
+                fd, temp_path = tempfile.mkstemp(suffix=KNOWLEDGE_FILE_EXT)
+                os.close(fd)
+                temp_paths.append(temp_path)
+                save_knowledge_file(load_knowledge(path), temp_path)
+                file_paths.append(temp_path)
+
+        streams = [iter_knowledge_file(path, chunk_rows) for path in file_paths]
+        rows = heapq.merge(*streams, key=lambda row: (row[0], row[1]))
+
+        n_edges = 0
+        with open(output, 'wb') as f:
+            f.write(_MAGIC)
+            buffer = []
+            for _, group in groupby(rows, key=lambda row: (row[0], row[1])):
+                buffer.append(_aggregate(list(group), agg))
+                if len(buffer) >= chunk_rows:
+                    f.write(np.array(buffer, dtype=EDGE_DTYPE).tobytes())
+                    n_edges += len(buffer)
+                    buffer = []
+
+            if buffer:
+                f.write(np.array(buffer, dtype=EDGE_DTYPE).tobytes())
+                n_edges += len(buffer)
+
+    finally:
+        for temp_path in temp_paths:
+            os.remove(temp_path)
+
+    return n_edges
+
+
+if __name__ == '__main__':
+    import argparse
+
+    ap = argparse.ArgumentParser(description='Convert or merge CPU knowledge files.')
+    ap.add_argument('output',
+                    help='Path of binary knowledge file (.tttk) to write.')
+    ap.add_argument('inputs', nargs='+',
+                    help='Paths to knowledge files (.tttk or pickled) to convert/merge.')
+    ap.add_argument('-a', '--agg', default='sum', choices=['sum', 'mean', 'count_weighted'],
+                    help='How to combine an edge found in several files.')
+    args = vars(ap.parse_args())
+
+    n_written = merge_knowledge_files(args['inputs'], args['output'], agg=args['agg'])
+    print(f'Wrote {n_written} edges to {args["output"]}')
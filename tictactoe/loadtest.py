@@ -0,0 +1,258 @@
+import time
+import tracemalloc
+from collections import Counter
+from multiprocessing import Pool
+import numpy as np
+from .tictactoe import TicTacToe
+from .game_io import ScriptedIO
+from .random_stream import RandomStream
+
+
+class ScriptedPlayer:
+    """Answer the CLI prompts of a TicTacToe game like a User picking random open cells
+
+    Pieces alternate between X and O each game.  Results are counted from the game over message
+    shown to the player (see `observe()`), so games played elsewhere (i.e. background training) don't count.
+
+    :param ttt: TicTacToe instance being played (its board is read to pick legal cells)
+    :param n_games: number of games to play before declining to play again
+    :param rng: RandomStream to pick cells from
+    """
+    def __init__(self, ttt, n_games, rng):
+        self.ttt = ttt
+        self.n_games = n_games
+        self.rng = rng
+        self.n_played = 0
+        self.piece = None
+        self.user_wins = 0
+        self.cpu_wins = 0
+        self.draws = 0
+
+    def __repr__(self):
+        return f'<ScriptedPlayer with {self.n_played}/{self.n_games} games played>'
+
+    def __call__(self, prompt):
+        if 'Which piece' in prompt:
+            self.piece = 'XO'[self.n_played % 2]
+            return self.piece
+
+        if 'Where to place' in prompt:
+            open_cells = [i for i, p in enumerate(self.ttt.flat_board) if p == '0']
+            return str(open_cells[self.rng.choice(len(open_cells))] + 1)
+
+        if 'Play again' in prompt:
+            self.n_played += 1
+            return 'y' if self.n_played < self.n_games else 'n'
+
+        raise ValueError(f'Unexpected prompt: {prompt!r}')
+
+    def observe(self, text):
+        """Count the result of a game from its game over message"""
+        if not text.startswith('Game Over.'):
+            return
+
+        winner = text.split()[2]
+        if winner == self.piece:
+            self.user_wins += 1
+        elif winner in ('X', 'O'):
+            self.cpu_wins += 1
+        else:
+            self.draws += 1
+
+
+def run_session(n_games=10, rng=None, cpu_difficulty=100, trace_memory=True, **play_kwargs):
+    """Play a full CLI session against a scripted User and measure it
+
+    The session goes through `TicTacToe.play()` exactly as the CLI does (including loading knowledge),
+    with prompts answered by a ScriptedPlayer and no display or pauses between turns.
+
+    :param n_games: number of games in the session
+    :param rng: RandomStream (or seed for one) for both the CPU and the scripted User
+    :param cpu_difficulty: passed to `TicTacToe.play()`
+    :param trace_memory: Should peak memory be measured with tracemalloc? (slows the session down)
+    :param play_kwargs: keyword arguments passed to `TicTacToe.play()` (cli is always True)
+    :return: dict of session measurements; peak_bytes is None if trace_memory is False
+
+    >>> session = run_session(3, rng=42, use_saved_knowledge=False, train_n_games=50)
+    >>> session['n_games'], session['n_prompts'] > 3 * 3
+    (3, True)
+    >>> session['cpu_wins'] + session['user_wins'] + session['draws']
+    3
+    """
+    if not isinstance(rng, RandomStream):
+        rng = RandomStream(rng)
+
+    cpu_rng, player_rng = rng.spawn(2)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    ttt = TicTacToe(rng=cpu_rng)
+    player = ScriptedPlayer(ttt, n_games, player_rng)
+    ttt.io = ScriptedIO(player, on_output=player.observe)
+    ttt.play(cpu_difficulty=cpu_difficulty, cli=True, **play_kwargs)
+
+    seconds = time.perf_counter() - start
+    peak_bytes = None
+    if trace_memory:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'n_games': player.n_played,
+        'n_prompts': ttt.io.n_prompts,
+        'seconds': seconds,
+        'peak_bytes': peak_bytes,
+        'cpu_wins': player.cpu_wins,
+        'user_wins': player.user_wins,
+        'draws': player.draws,
+    }
+
+
+def _session_worker(args):
+    n_games, rng, cpu_difficulty, trace_memory, play_kwargs = args
+    return run_session(n_games, rng, cpu_difficulty, trace_memory, **play_kwargs)
+
+
+def run_load_test(n_sessions, n_games=10, n_workers=4, seed=None, cpu_difficulty=100, trace_memory=True,
+                  **play_kwargs):
+    """Run many headless CLI sessions spread over several processes
+
+    Each session gets its own RandomStream spawned from `seed`; see `run_session()`.
+
+    :param n_sessions: number of sessions to run
+    :param n_games: number of games per session
+    :param n_workers: number of worker processes
+    :param seed: seed for RandomStream that session streams are spawned from
+    :param cpu_difficulty: passed to `TicTacToe.play()`
+    :param trace_memory: Should peak memory of each session be measured? (slows sessions down)
+    :param play_kwargs: keyword arguments passed to `TicTacToe.play()`
+    :return: dict of load test statistics; see `summarize_sessions()`
+    """
+    streams = RandomStream(seed).spawn(n_sessions)
+    jobs = [(n_games, stream, cpu_difficulty, trace_memory, play_kwargs) for stream in streams]
+
+    start = time.perf_counter()
+    with Pool(n_workers) as pool:
+        sessions = pool.map(_session_worker, jobs)
+
+    return summarize_sessions(sessions, time.perf_counter() - start)
+
+
+def summarize_sessions(sessions, wall_seconds):
+    """Summarize output of `run_session()` for many sessions
+
+    Statistics that can't be computed (i.e. latency of zero sessions or rates of zero games) are None.
+
+    :param sessions: list of dicts returned by `run_session()`
+    :param wall_seconds: wall clock seconds it took to run every session
+    :return: dict of statistics
+
+    >>> stats = summarize_sessions([], 0.0)
+    >>> stats['n_sessions'], stats['session_seconds_p50'], stats['draw_rate']
+    (0, None, None)
+    """
+    seconds = np.array([s['seconds'] for s in sessions])
+    peak_mb = np.array([s['peak_bytes'] for s in sessions if s['peak_bytes'] is not None]) / 1e6
+    totals = Counter()
+    for session in sessions:
+        totals.update({k: session[k] for k in ('n_games', 'n_prompts', 'cpu_wins', 'user_wins', 'draws')})
+
+    n_games = totals['n_games']
+    return {
+        'n_sessions': len(sessions),
+        'n_games': n_games,
+        'n_prompts': totals['n_prompts'],
+        'wall_seconds': wall_seconds,
+        'sessions_per_second': len(sessions) / wall_seconds if wall_seconds else None,
+        'games_per_second': n_games / wall_seconds if wall_seconds else None,
+        'session_seconds_p50': float(np.percentile(seconds, 50)) if len(seconds) else None,
+        'session_seconds_p95': float(np.percentile(seconds, 95)) if len(seconds) else None,
+        'session_seconds_max': float(seconds.max()) if len(seconds) else None,
+        'game_seconds_mean': float(seconds.sum() / n_games) if n_games else None,
+        'peak_mb_mean': float(peak_mb.mean()) if len(peak_mb) else None,
+        'peak_mb_max': float(peak_mb.max()) if len(peak_mb) else None,
+        'cpu_win_rate': totals['cpu_wins'] / n_games if n_games else None,
+        'user_win_rate': totals['user_wins'] / n_games if n_games else None,
+        'draw_rate': totals['draws'] / n_games if n_games else None,
+    }
+
+
+def format_report(stats):
+    """Format output of `summarize_sessions()` as a readable report
+
+    >>> print(format_report(summarize_sessions([], 0.0)))
+    Sessions: 0  Games: 0  Prompts: 0
+    Wall time: 0.00s
+    """
+    lines = [
+        f"Sessions: {stats['n_sessions']}  Games: {stats['n_games']}  Prompts: {stats['n_prompts']}",
+        f"Wall time: {stats['wall_seconds']:.2f}s",
+    ]
+    if stats['sessions_per_second'] is not None:
+        lines[1] += (f" ({stats['sessions_per_second']:.1f} sessions/s, "
+                     f"{stats['games_per_second']:.1f} games/s)")
+    if stats['session_seconds_p50'] is not None:
+        lines.append(f"Session latency: p50 {stats['session_seconds_p50'] * 1000:.1f}ms  "
+                     f"p95 {stats['session_seconds_p95'] * 1000:.1f}ms  "
+                     f"max {stats['session_seconds_max'] * 1000:.1f}ms")
+    if stats['game_seconds_mean'] is not None:
+        lines[-1] += f"  (mean {stats['game_seconds_mean'] * 1000:.2f}ms per game)"
+    if stats['peak_mb_mean'] is not None:
+        lines.append(f"Session peak memory: mean {stats['peak_mb_mean']:.2f} MB  "
+                     f"max {stats['peak_mb_max']:.2f} MB")
+    if stats['n_games']:
+        lines.append(f"CPU win rate: {stats['cpu_win_rate']:.1%}  User win rate: {stats['user_win_rate']:.1%}  "
+                     f"Draw rate: {stats['draw_rate']:.1%}")
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description='Load test the CLI game loop with scripted Users.')
+    ap.add_argument('-n', '--n_sessions', type=int, default=1000,
+                    help='Number of sessions to run.')
+    ap.add_argument('-g', '--n_games', type=int, default=10,
+                    help='Number of games per session.')
+    ap.add_argument('-j', '--n_workers', type=int, default=4,
+                    help='Number of worker processes.')
+    ap.add_argument('--seed', type=int, default=None,
+                    help='Seed for reproducible sessions.')
+    ap.add_argument('-d', '--cpu_difficulty', type=int, default=100,
+                    help='Number in range [0, 100] to set CPU skill level.')
+    ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
+                    help="Path to file to read for CPU's knowledge in each session.")
+    ap.add_argument('-p', '--policy_table', default=None,
+                    help="Path to policy table (.npy) for CPU to pick moves from instead of its knowledge. "
+                         "'default' uses the table shipped with the package.")
+    ap.add_argument('-m', '--compact_knowledge', type=int, default=0,
+                    help='Should knowledge be loaded in a memory optimized form? (1 if so)')
+    ap.add_argument('-f', '--smooth_difficulty', default='0',
+                    help="Should CPU sample moves from per difficulty tables? (1 to build them from knowledge "
+                         "in each session, or path to saved tables (.npz); 'default' uses the shipped tables)")
+    ap.add_argument('-t', '--trace_memory', type=int, default=1,
+                    help='Should peak memory of each session be measured? (0 if not; tracing slows sessions down)')
+    ap.add_argument('-o', '--output', default=None,
+                    help='Path to write statistics to as JSON.')
+    args = vars(ap.parse_args())
+
+    load_stats = run_load_test(args['n_sessions'],
+                               n_games=args['n_games'],
+                               n_workers=args['n_workers'],
+                               seed=args['seed'],
+                               cpu_difficulty=args['cpu_difficulty'],
+                               trace_memory=args['trace_memory'] != 0,
+                               knowledge=args['knowledge'],
+                               policy_table=args['policy_table'],
+                               compact_knowledge=args['compact_knowledge'] != 0,
+                               smooth_difficulty={'0': False, '1': True}.get(args['smooth_difficulty'],
+                                                                             args['smooth_difficulty']))
+    print(format_report(load_stats))
+
+    if args['output'] is not None:
+        with open(args['output'], 'w') as f:
+            json.dump(load_stats, f, indent=2)
@@ -0,0 +1,123 @@
+import queue
+import threading
+from .graph import Graph
+from .game_record import game_edges
+
+_STOP = object()
+
+
+class OnlineLearner:
+    """Learn from finished games in a background thread while games are being played
+
+    Games are queued with `submit()` and merged into knowledge by a background thread.
+    Updates are never made in place; each batch of games is published as a new Graph in the
+    `snapshot` attribute.  Unchanged Node objects are shared between snapshots and changed
+    nodes are replaced with new Node objects, so a reader holding an older snapshot never
+    sees a half merged graph and never has to lock.  Snapshots must be treated as read only.
+
+    :param cpu_knowledge: Graph of knowledge to start from (not modified)
+    :param batch_size: max number of queued games to merge before publishing a new snapshot
+    :param weights: keyword arguments passed to `game_record.game_edges()`
+    :ivar snapshot: latest published Graph of knowledge
+    :ivar version: number of snapshots published
+    :ivar n_games: number of games merged into snapshot
+
+    >>> learner = OnlineLearner().start()
+    >>> learner.submit([0, 3, 1, 4, 2], 1)
+    >>> learner.flush()
+    >>> learner.snapshot.nodes['000000000'].edges
+    {'100000000': 5}
+    >>> learner.stop()
+    <Graph with 5 nodes>
+    """
+    def __init__(self, cpu_knowledge=None, batch_size=64, **weights):
+        self.snapshot = Graph() if cpu_knowledge is None else cpu_knowledge
+        self.version = 0
+        self.n_games = 0
+        self.batch_size = batch_size
+        self._weights = weights
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def __repr__(self):
+        return f'<OnlineLearner at version {self.version} with {self.n_games} games>'
+
+    def start(self):
+        """Start background learning thread
+
+        :return: self
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, moves, winner):
+        """Queue a finished game to be learned from; never blocks
+
+        :param moves: flat board indices in the order they were played (X plays first)
+        :param winner: piece value of winner (0 for a tie)
+        :return: None
+        """
+        self._queue.put((tuple(moves), int(winner)))
+
+    def flush(self):
+        """Block until every submitted game has been published in a snapshot"""
+        self._queue.join()
+
+    def stop(self):
+        """Learn from any remaining games and stop background thread
+
+        :return: final snapshot of knowledge
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+        return self.snapshot
+
+    def _run(self):
+        while True:
+            games = [self._queue.get()]
+            while len(games) < self.batch_size:
+                try:
+                    games.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in games
+            games = [game for game in games if game is not _STOP]
+            if games:
+                self._publish(games)
+
+            for _ in range(len(games) + stop):
+                self._queue.task_done()
+
+            if stop:
+                break
+
+    def _publish(self, games):
+        """Merge games into a copy of snapshot and swap it in"""
+        delta = {}
+        counts = dict(self.snapshot.edge_counts)
+        for moves, winner in games:
+            for node, edge, weight in game_edges(moves, winner, **self._weights):
+                edges = delta.setdefault(node, {})
+                edges[edge] = edges.get(edge, 0) + weight
+                counts[node, edge] = counts.get((node, edge), 0) + 1
+
+        nodes = dict(self.snapshot.nodes)
+        for name, new_edges in delta.items():
+            edges = dict(nodes[name].edges) if name in nodes else {}
+            for edge, weight in new_edges.items():
+                edges[edge] = edges[edge] + weight if edge in edges else weight
+
+            nodes[name] = self.snapshot.node_class(name, edges=edges)
+
+        snapshot = type(self.snapshot)()
+        snapshot.nodes = nodes
+        snapshot.edge_counts = counts
+
+        self.snapshot = snapshot
+        self.n_games += len(games)
+        self.version += 1
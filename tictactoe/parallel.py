@@ -0,0 +1,62 @@
+from itertools import chain
+from multiprocessing import Pool
+from .tictactoe import TicTacToe
+from .graph import Graph
+from .game_record import GameRecordBuffer, knowledge_from_records
+from .random_stream import RandomStream
+
+
+def self_play_games(n_games, rng, cpu_knowledge=None, random_move_percent=0.25):
+    """Play training games and return them as encoded game records
+
+    :param n_games: number of games for computer to play itself
+    :param rng: RandomStream (or seed for one) to draw random moves from
+    :param cpu_knowledge: Graph of knowledge to start training from; a copy is trained on
+    :param random_move_percent: chance for CPU to make random choice rather than best known choice
+    :return: bytes of concatenated encoded games; see `game_record.iter_game_bytes()`
+    """
+    if not isinstance(rng, RandomStream):
+        rng = RandomStream(rng)
+
+    # Training adds to knowledge so work on a copy when running in the calling process
+    knowledge = Graph()
+    if cpu_knowledge is not None:
+        knowledge.add_nodes(list(cpu_knowledge.nodes.keys()),
+                            [dict(node.edges) for node in cpu_knowledge.nodes.values()])
+
+    ttt = TicTacToe(cpu_knowledge=knowledge, game_record=GameRecordBuffer(), rng=rng)
+    ttt.train_cpu(n_games, random_move_percent=random_move_percent, progress_bar=False)
+
+    return bytes(ttt.game_record.data)
+
+
+def _self_play_worker(args):
+    return self_play_games(*args)
+
+
+def parallel_self_play(n_games, n_workers=4, seed=None, cpu_knowledge=None, random_move_percent=0.25):
+    """Train CPU knowledge with self-play spread over several processes
+
+    Each worker gets its own RandomStream spawned from `seed` and trains on its own copy of knowledge.
+    Workers' games are then merged into `cpu_knowledge` as if trained with `TicTacToe.train_cpu()`.
+    The same seed and number of workers always produce the same knowledge.
+
+    :param n_games: total number of games for computer to play itself
+    :param n_workers: number of worker processes
+    :param seed: seed for RandomStream that worker streams are spawned from
+    :param cpu_knowledge: Graph of knowledge to start from and add to; if None a new Graph is created
+    :param random_move_percent: chance for CPU to make random choice rather than best known choice
+    :return: Graph of knowledge
+    """
+    if cpu_knowledge is None:
+        cpu_knowledge = Graph()
+
+    streams = RandomStream(seed).spawn(n_workers)
+    games_per_worker = [n_games // n_workers + (i < n_games % n_workers) for i in range(n_workers)]
+    jobs = [(n, stream, cpu_knowledge, random_move_percent) for n, stream in zip(games_per_worker, streams)]
+
+    with Pool(n_workers) as pool:
+        records = pool.map(_self_play_worker, jobs)
+
+    buffers = (GameRecordBuffer(data) for data in records)
+    return knowledge_from_records(chain.from_iterable(buffers), graph=cpu_knowledge)
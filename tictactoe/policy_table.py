@@ -0,0 +1,248 @@
+import os
+import numpy as np
+from .board_utils import first_person_board, second_person_board, board_diff, board_to_code
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(__file__), 'cpu_policy.npy')
+
+# Marks the end of a ranked move list (and rows of unreachable positions)
+NO_MOVE = 255
+
+_lines = [(0, 1, 2), (3, 4, 5), (6, 7, 8),
+          (0, 3, 6), (1, 4, 7), (2, 5, 8),
+          (0, 4, 8), (2, 4, 6)]
+
+
+def board_winner(flat_board):
+    """Find winner of a flat board str
+
+    :param flat_board: flat board str (i.e. '111220000')
+    :return: '1' or '2' if that piece has three in a row; else None
+
+    >>> board_winner('111220000')
+    '1'
+    >>> board_winner('120000000')
+    """
+    for a, b, c in _lines:
+        if flat_board[a] != '0' and flat_board[a] == flat_board[b] == flat_board[c]:
+            return flat_board[a]
+
+    return None
+
+
+def player_to_move(flat_board):
+    """Piece value of player to move (X/1 always plays first)"""
+    return 1 if flat_board.count('1') == flat_board.count('2') else 2
+
+
+def play_move(flat_board, cell, player):
+    """Place piece of player at flat board index cell
+
+    >>> play_move('000000000', 4, 1)
+    '000010000'
+    """
+    return flat_board[:cell] + str(player) + flat_board[cell + 1:]
+
+
+def reachable_positions():
+    """Enumerate every position reachable in a legal game starting from '000000000'
+
+    :return: dict of `{flat_board: is_terminal}`
+
+    >>> positions = reachable_positions()
+    >>> len(positions)
+    5478
+    >>> sum(not is_terminal for is_terminal in positions.values())
+    4520
+    """
+    positions = {}
+    frontier = ['000000000']
+    while frontier:
+        next_frontier = []
+        for board in frontier:
+            if board in positions:
+                continue
+
+            is_terminal = board_winner(board) is not None or '0' not in board
+            positions[board] = is_terminal
+            if not is_terminal:
+                player = player_to_move(board)
+                next_frontier.extend(play_move(board, i, player) for i, p in enumerate(board) if p == '0')
+
+        frontier = next_frontier
+
+    return positions
+
+
+def solve(positions=None):
+    """Find the value of every reachable position with perfect play by both players
+
+    :param positions: output of `reachable_positions()`; computed if None
+    :return: dict of `{flat_board: value}` where value is from the point of view of the player to move
+             (1 is a forced win, 0 is a draw, -1 is a forced loss)
+
+    >>> values = solve()
+    >>> values['000000000']
+    0
+    >>> values['110220000']
+    1
+    """
+    if positions is None:
+        positions = reachable_positions()
+
+    values = {}
+    # Fill in values from full boards back to the empty board
+    for board in sorted(positions, key=lambda b: b.count('0')):
+        if board_winner(board) is not None:
+            # The player that just moved won
+            values[board] = -1
+        elif '0' not in board:
+            values[board] = 0
+        else:
+            player = player_to_move(board)
+            values[board] = max(-values[play_move(board, i, player)] for i, p in enumerate(board) if p == '0')
+
+    return values
+
+
+def _solver_ranking(board, values):
+    player = player_to_move(board)
+    open_cells = [i for i, p in enumerate(board) if p == '0']
+
+    return sorted(open_cells, key=lambda i: values[play_move(board, i, player)])
+
+
+def _knowledge_ranking(board, values, cpu_knowledge):
+    """Rank moves as `TicTacToe.cpu_place_piece()` would; unseen moves follow in solver order"""
+    player = player_to_move(board)
+    fp_board = first_person_board(board, player)
+    sp_board = second_person_board(board, player)
+
+    ranking = []
+    try:
+        edges = cpu_knowledge.nodes[sp_board].edges
+    except KeyError:
+        edges = {}
+
+    for move in sorted(edges.keys(), key=lambda x: -edges[x]):
+        cell = board_diff(fp_board, move)
+        if cell is None:
+            continue
+
+        cell = cell[1] * 3 + cell[0]
+        if move == play_move(fp_board, cell, 1) and cell not in ranking:
+            ranking.append(cell)
+
+    ranking.extend(i for i in _solver_ranking(board, values) if i not in ranking)
+
+    return ranking
+
+
+def build_policy_table(source='solver', cpu_knowledge=None):
+    """Record a ranked move list for every reachable position
+
+    Rows are indexed by `board_to_code()` of the board in second person view of the player to move
+    (the same key `TicTacToe.cpu_place_piece()` looks up in `cpu_knowledge`).
+    Each row holds the flat board indices of legal moves from best to worst followed by `NO_MOVE` padding.
+
+    :param source: 'solver' to rank moves by perfect play or
+                   'knowledge' to rank moves by `cpu_knowledge` edge weights
+                   (moves missing from knowledge are ranked after known moves using the solver)
+    :param cpu_knowledge: Graph of CPU knowledge; required if `source == 'knowledge'`
+    :return: uint8 numpy array of shape (3 ** 9, 9)
+
+    >>> table = build_policy_table()
+    >>> table.shape
+    (19683, 9)
+    >>> # O must block X at the 3rd position
+    >>> int(table[board_to_code(second_person_board('110200000', 2))][0])
+    2
+    """
+    if source not in ('solver', 'knowledge'):
+        raise ValueError("source must be 'solver' or 'knowledge'")
+
+    if source == 'knowledge' and cpu_knowledge is None:
+        raise ValueError("cpu_knowledge is required when source is 'knowledge'")
+
+    positions = reachable_positions()
+    values = solve(positions)
+
+    table = np.full((3 ** 9, 9), NO_MOVE, dtype=np.uint8)
+    for board, is_terminal in positions.items():
+        if is_terminal:
+            continue
+
+        if source == 'solver':
+            ranking = _solver_ranking(board, values)
+        else:
+            ranking = _knowledge_ranking(board, values, cpu_knowledge)
+
+        sp_board = second_person_board(board, player_to_move(board))
+        table[board_to_code(sp_board), :len(ranking)] = ranking
+
+    return table
+
+
+def move_values():
+    """Solver value of every legal move in every reachable non-terminal position
+
+    :return: float array of shape (3 ** 9, 9) indexed by second person board code then cell;
+             values are from the mover's point of view (nan for illegal/unreachable)
+    """
+    positions = reachable_positions()
+    values = solve(positions)
+
+    table = np.full((3 ** 9, 9), np.nan)
+    for board, is_terminal in positions.items():
+        if is_terminal:
+            continue
+
+        player = player_to_move(board)
+        code = board_to_code(second_person_board(board, player))
+        for cell in range(9):
+            if board[cell] == '0':
+                table[code, cell] = -values[play_move(board, cell, player)]
+
+    return table
+
+
+def save_policy_table(table, path=DEFAULT_POLICY_PATH):
+    np.save(path, table, allow_pickle=False)
+
+
+def load_policy_table(path=DEFAULT_POLICY_PATH):
+    """Read a policy table saved by `save_policy_table()`
+
+    :param path: path to .npy policy table; 'default' reads the table shipped with the package
+    :return: uint8 numpy array of shape (3 ** 9, 9)
+
+    >>> load_policy_table('default').shape
+    (19683, 9)
+    """
+    if path == 'default':
+        path = DEFAULT_POLICY_PATH
+
+    return np.load(path, allow_pickle=False)
+
+
+if __name__ == '__main__':
+    import argparse
+    from .knowledge_io import load_knowledge
+
+    ap = argparse.ArgumentParser(description='Build a ranked move table for every reachable position.')
+    ap.add_argument('-s', '--source', default='solver', choices=['solver', 'knowledge'],
+                    help='Rank moves by perfect play (solver) or by trained CPU knowledge (knowledge).')
+    ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
+                    help="Path to CPU knowledge file (.tttk or pickled). Ignored if source is solver.")
+    ap.add_argument('-o', '--output', default=DEFAULT_POLICY_PATH,
+                    help='Path to save policy table to.')
+    args = vars(ap.parse_args())
+
+    knowledge = None
+    if args['source'] == 'knowledge':
+        knowledge = load_knowledge(args['knowledge'])
+
+    policy_table = build_policy_table(args['source'], knowledge)
+    save_policy_table(policy_table, args['output'])
+
+    n_positions = int((policy_table[:, 0] != NO_MOVE).sum())
+    print(f'Saved moves for {n_positions} positions to {args["output"]}')
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class RandomStream:
+    """Draw random numbers from a numpy Generator in pre-filled blocks
+
+    Drawing one scalar at a time from numpy has a high per call overhead.
+    RandomStream fills a block of uniform floats at once and hands them out one by one,
+    refilling the block when it runs out.
+
+    :param seed: int seed, `np.random.SeedSequence`, or `np.random.Generator` to draw from;
+                 if None then fresh entropy is used
+    :param block_size: number of random numbers to draw at a time
+    :ivar rng: underlying `np.random.Generator`
+
+    >>> stream = RandomStream(42)
+    >>> stream.choice(9)
+    6
+    >>> round(stream.random(), 4)
+    0.4389
+    """
+    def __init__(self, seed=None, block_size=1024):
+        if isinstance(seed, np.random.Generator):
+            self.rng = seed
+        else:
+            self.rng = np.random.default_rng(seed)
+
+        self.block_size = block_size
+        self._block = []
+        self._i = 0
+
+    def __repr__(self):
+        return f'<RandomStream with {len(self._block) - self._i} buffered numbers>'
+
+    def random(self):
+        """Draw a float in range [0, 1)"""
+        if self._i >= len(self._block):
+            self._block = self.rng.random(self.block_size).tolist()
+            self._i = 0
+
+        value = self._block[self._i]
+        self._i += 1
+        return value
+
+    def choice(self, n):
+        """Draw an int in range [0, n)"""
+        return int(self.random() * n)
+
+    def spawn(self, n_streams):
+        """Derive independent streams (i.e. one per worker) from this stream
+
+        Streams are derived from the underlying seed sequence,
+        so the same seed always produces the same set of streams.
+
+        :param n_streams: number of streams to create
+        :return: list of RandomStream objects
+
+        >>> [stream.choice(100) for stream in RandomStream(42).spawn(3)]
+        [91, 46, 7]
+        """
+        return [RandomStream(rng, self.block_size) for rng in self.rng.spawn(n_streams)]
+
+
+def default_stream():
+    """Create a RandomStream seeded from numpy's global random state
+
+    Keeps `np.random.seed()` working for reproducing games when no stream is given.
+    """
+    return RandomStream(np.random.randint(2 ** 32, dtype=np.uint64))
@@ -0,0 +1,212 @@
+import os
+import numpy as np
+from .board_utils import first_person_board, second_person_board, board_to_code
+from .policy_table import reachable_positions, move_values, player_to_move, play_move
+
+DIFFICULTY_LEVELS = (0, 10, 25, 50, 75, 90, 100)
+# Tables built from the shipped cpu_knowledge.pickle
+DEFAULT_SAMPLING_TABLES_PATH = os.path.join(os.path.dirname(__file__), 'cpu_sampling_tables.npz')
+
+
+def difficulty_temperature(difficulty):
+    """Softmax temperature used for a difficulty level
+
+    100 always picks the best move (temperature 0), 0 picks uniformly at random (infinite temperature),
+    and 50 uses a temperature of 1 on edge weights scaled to [-1, 1].
+
+    >>> difficulty_temperature(50)
+    1.0
+    >>> difficulty_temperature(75)
+    0.3333333333333333
+    """
+    if difficulty <= 0:
+        return np.inf
+
+    return (100 - difficulty) / difficulty
+
+
+def _move_probabilities(weights, temperature):
+    """Softmax of weights scaled to [-1, 1] at a temperature"""
+    weights = np.asarray(weights, dtype=float)
+    scale = np.abs(weights).max()
+    if scale > 0:
+        weights = weights / scale
+
+    if np.isinf(temperature):
+        return np.full(len(weights), 1 / len(weights))
+
+    if temperature == 0:
+        best = weights == weights.max()
+        return best / best.sum()
+
+    exp = np.exp((weights - weights.max()) / temperature)
+    return exp / exp.sum()
+
+
+def _alias_table(probabilities):
+    """Build Vose alias table so a move can be sampled with one uniform pick and one coin flip
+
+    :return: tuple of (prob, alias) arrays the same length as probabilities
+    """
+    n = len(probabilities)
+    prob = np.zeros(n)
+    alias = np.zeros(n, dtype=np.uint8)
+    scaled = list(np.asarray(probabilities) * n)
+    small = [i for i, p in enumerate(scaled) if p < 1]
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] = scaled[g] + scaled[s] - 1
+        if scaled[g] < 1:
+            small.append(g)
+        else:
+            large.append(g)
+
+    for i in small + large:
+        prob[i] = 1
+
+    return prob, alias
+
+
+class SamplingTables:
+    """Precomputed per position move sampling tables for a set of difficulty levels
+
+    For every reachable position and difficulty level, an alias table over a temperature scaled
+    softmax of move weights is stored (see `difficulty_temperature()`), so a move at any
+    difficulty is sampled in O(1) and skill degrades smoothly as difficulty drops.
+
+    Rows are indexed by `board_to_code()` of the board in second person view of the player to move
+    (the same key `TicTacToe.cpu_place_piece()` looks up in `cpu_knowledge`).
+
+    :param cells: uint8 array (3 ** 9, 9) of legal move cells per position
+    :param n_moves: uint8 array (3 ** 9,) of number of legal moves per position (0 if unreachable)
+    :param prob: float32 array (n_levels, 3 ** 9, 9) of alias table probabilities
+    :param alias: uint8 array (n_levels, 3 ** 9, 9) of alias table aliases
+    :param levels: difficulty levels the tables were built for
+
+    >>> from tictactoe.random_stream import RandomStream
+    >>> tables = SamplingTables.build(levels=(0, 100))
+    >>> # O must block X at the 3rd position
+    >>> tables.sample(board_to_code('110020000'), 100, RandomStream(42))
+    2
+    """
+    def __init__(self, cells, n_moves, prob, alias, levels=DIFFICULTY_LEVELS):
+        self.cells = cells
+        self.n_moves = n_moves
+        self.prob = prob
+        self.alias = alias
+        self.levels = np.asarray(levels)
+        # Nearest built level for each whole number difficulty
+        self._level_index = np.abs(self.levels[None, :] - np.arange(101)[:, None]).argmin(axis=1).tolist()
+
+    def __repr__(self):
+        return f'<SamplingTables for difficulty levels {self.levels.tolist()}>'
+
+    @classmethod
+    def build(cls, cpu_knowledge=None, levels=DIFFICULTY_LEVELS):
+        """Build sampling tables from CPU knowledge edge weights or from perfect play
+
+        :param cpu_knowledge: Graph of CPU knowledge to weight moves by (moves missing from knowledge
+                              get a weight of 0); if None moves are weighted by solver value
+                              (1 for a forced win, 0 for a draw, -1 for a forced loss)
+        :param levels: difficulty levels in range [0, 100] to build tables for
+        :return: SamplingTables
+        """
+        solver_values = move_values() if cpu_knowledge is None else None
+
+        cells = np.zeros((3 ** 9, 9), dtype=np.uint8)
+        n_moves = np.zeros(3 ** 9, dtype=np.uint8)
+        prob = np.zeros((len(levels), 3 ** 9, 9), dtype=np.float32)
+        alias = np.zeros((len(levels), 3 ** 9, 9), dtype=np.uint8)
+
+        for board, is_terminal in reachable_positions().items():
+            if is_terminal:
+                continue
+
+            player = player_to_move(board)
+            code = board_to_code(second_person_board(board, player))
+            open_cells = [i for i, p in enumerate(board) if p == '0']
+
+            if cpu_knowledge is None:
+                weights = solver_values[code, open_cells]
+            else:
+                node = cpu_knowledge.nodes.get(second_person_board(board, player))
+                edges = {} if node is None else node.edges
+                fp_board = first_person_board(board, player)
+                weights = [edges.get(play_move(fp_board, cell, 1), 0) for cell in open_cells]
+
+            n = len(open_cells)
+            cells[code, :n] = open_cells
+            n_moves[code] = n
+            for i, level in enumerate(levels):
+                prob[i, code, :n], alias[i, code, :n] = \
+                    _alias_table(_move_probabilities(weights, difficulty_temperature(level)))
+
+        return cls(cells, n_moves, prob, alias, levels)
+
+    def save(self, path=DEFAULT_SAMPLING_TABLES_PATH):
+        """Write tables to a compressed .npz file (reading one back is far quicker than `build()`)"""
+        np.savez_compressed(path, cells=self.cells, n_moves=self.n_moves, prob=self.prob, alias=self.alias,
+                            levels=self.levels)
+
+    @classmethod
+    def load(cls, path=DEFAULT_SAMPLING_TABLES_PATH):
+        """Read tables written by `save()`
+
+        :param path: path to .npz file; 'default' reads the tables shipped with the package
+        :return: SamplingTables
+
+        >>> SamplingTables.load('default')
+        <SamplingTables for difficulty levels [0, 10, 25, 50, 75, 90, 100]>
+        """
+        if path == 'default':
+            path = DEFAULT_SAMPLING_TABLES_PATH
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['cells'], data['n_moves'], data['prob'], data['alias'], data['levels'])
+
+    def sample(self, board_code, difficulty, rng):
+        """Sample a move for a position
+
+        :param board_code: `board_to_code()` of board in second person view of player to move
+        :param difficulty: number in range [0, 100]; the nearest built level is used
+        :param rng: RandomStream to draw from
+        :return: flat board index of move; None if position is not reachable in a legal game
+        """
+        n = self.n_moves[board_code]
+        if not n:
+            return None
+
+        level = self._level_index[min(max(int(round(difficulty)), 0), 100)]
+        k = rng.choice(n)
+        if rng.random() >= self.prob[level, board_code, k]:
+            k = self.alias[level, board_code, k]
+
+        return int(self.cells[board_code, k])
+
+
+if __name__ == '__main__':
+    import argparse
+    from .knowledge_io import load_knowledge
+
+    ap = argparse.ArgumentParser(description='Build move sampling tables for smooth CPU difficulty.')
+    ap.add_argument('-s', '--source', default='knowledge', choices=['solver', 'knowledge'],
+                    help='Weight moves by trained CPU knowledge (knowledge) or by perfect play (solver).')
+    ap.add_argument('-k', '--knowledge', default='cpu_knowledge.pickle',
+                    help="Path to CPU knowledge file (.tttk or pickled). Ignored if source is solver.")
+    ap.add_argument('-o', '--output', default=DEFAULT_SAMPLING_TABLES_PATH,
+                    help='Path to save sampling tables (.npz) to.')
+    args = vars(ap.parse_args())
+
+    knowledge = None
+    if args['source'] == 'knowledge':
+        knowledge = load_knowledge(args['knowledge'])
+
+    tables = SamplingTables.build(knowledge)
+    tables.save(args['output'])
+
+    print(f'Saved {tables} to {args["output"]}')
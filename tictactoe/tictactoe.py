@@ -1,10 +1,16 @@
 import os
-import time
-import pickle
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import numpy as np
 from tqdm import tqdm
-from .board_utils import flatten_board, first_person_board, second_person_board, board_diff
+from .board_utils import flatten_board, first_person_board, second_person_board, board_diff, board_to_code
 from .graph import Graph
+from .game_record import GameRecordWriter
+from .policy_table import NO_MOVE, load_policy_table
+from .online import OnlineLearner
+from .game_io import ConsoleIO
+from .sampling_tables import SamplingTables
+from .random_stream import RandomStream, default_stream
+from .knowledge_io import load_knowledge, save_knowledge
 
 
 class TicTacToe:
@@ -18,15 +24,19 @@ class TicTacToe:
                  '---|---|---\n'\
                  ' 7 | 8 | 9\n'
 
-    def __init__(self, cpu_knowledge=None):
-        self.board = np.array([[0, 0, 0],
-                               [0, 0, 0],
-                               [0, 0, 0]])
-        self.game_is_over = False
-        self.winner = 0
-        self.last_played_piece = None
-        self.last_played_loc = None
+    def __init__(self, cpu_knowledge=None, game_record=None, policy_table=None, online_learner=None, rng=None,
+                 sampling_tables=None, io=None):
+        self._new_game()
         self.cpu_knowledge = Graph() if cpu_knowledge is None else cpu_knowledge
+        self.game_record = game_record
+        self.policy_table = policy_table
+        self.sampling_tables = sampling_tables
+        self.io = ConsoleIO() if io is None else io
+        self.online_learner = online_learner
+        self.rng = default_stream() if rng is None else rng
+        self.knowledge_deadline = None
+        self._knowledge_future = None
+        self._unlearned_games = []
 
         self.cli = True
 
@@ -78,14 +88,27 @@ class TicTacToe:
         """
         return flatten_board(self)
 
+    def _new_game(self):
+        """Set up empty board"""
+        self.board = np.array([[0, 0, 0],
+                               [0, 0, 0],
+                               [0, 0, 0]])
+        self.game_is_over = False
+        self.winner = 0
+        self.last_played_piece = None
+        self.last_played_loc = None
+        self.moves = []
+
     def reset_game(self, reset_cpu_knowledge=False):
         """Clear board"""
+        self._new_game()
         if reset_cpu_knowledge:
-            cpu_knowledge = None
-        else:
-            cpu_knowledge = self.cpu_knowledge
+            self.cpu_knowledge = Graph()
 
-        self.__init__(cpu_knowledge=cpu_knowledge)
+    def _record_game(self):
+        """Write finished game to game_record (if one is being kept)"""
+        if self.game_record is not None:
+            self.game_record.write(self.moves, self.winner)
 
     @staticmethod
     def _three_in_a_row(values):
@@ -146,12 +169,12 @@ class TicTacToe:
         return 0
 
     def _get_player_location_cli(self):
-        """Prompt user for x,y location to place piece by input()"""
+        """Prompt user for x,y location to place piece through io"""
         msg = '\nWhere to place piece?\n(choose number 1-9):'
         if self.board.sum() == 0:
             msg += f'\n\n{self._num_board}\nSelection:'
 
-        input_loc = input(msg)
+        input_loc = self.io.input(msg)
         return int(input_loc.strip())
 
     @staticmethod
@@ -175,7 +198,7 @@ class TicTacToe:
 
         :param value: value of piece to place (either 1 or 2)
         :param position: coordinates to place piece as (x, y) on zero indexed 2d grid;
-                         if None then position will be prompted via input() if self.cli is True
+                         if None then position will be prompted through io if self.cli is True
 
 
         >>> ttt = TicTacToe()
@@ -201,6 +224,7 @@ class TicTacToe:
             self.board[y, x] = value
             self.last_played_loc = position
             self.last_played_piece = value
+            self.moves.append(y * 3 + x)
         else:
             raise IndexError('A piece is already placed at that position.')
 
@@ -211,15 +235,14 @@ class TicTacToe:
 
         :param value: value of piece to randomly place
 
-        >>> np.random.seed(42)
-        >>> ttt = TicTacToe()
+        >>> ttt = TicTacToe(rng=RandomStream(42))
         >>> ttt.place_random_piece(1)
         >>> ttt.place_random_piece(2)
         >>> ttt.place_random_piece(1)
         >>> ttt.board
         array([[0, 0, 0],
-               [2, 0, 1],
-               [1, 0, 0]])
+               [2, 0, 0],
+               [1, 0, 1]])
         """
         open_spaces = np.where(self.board == 0)
         n_open = len(open_spaces[0])
@@ -227,7 +250,7 @@ class TicTacToe:
         if not n_open:
             self.game_is_over = True
         else:
-            i = np.random.choice(n_open)
+            i = self.rng.choice(n_open)
             position = open_spaces[1][i], open_spaces[0][i]
 
             self.place_piece(value, position)
@@ -235,32 +258,83 @@ class TicTacToe:
     def cpu_place_piece(self, value, difficulty=100):
         """Have a CPU player place a piece
 
-        If ai has not been trained then this is equivalent to TicTacToe.place_random_piece().
+        If sampling_tables are set (see `tictactoe.sampling_tables`), the move is sampled from them so
+        skill degrades smoothly with difficulty rather than mixing best and random moves.
+        Otherwise if a policy_table is set (see `tictactoe.policy_table`), its ranked moves are played.
+        Otherwise if ai has not been trained then this is equivalent to TicTacToe.place_random_piece().
         Train with TicTacToe.train_cpu().
 
+        If knowledge is still loading in the background (see `TicTacToe.start_loading_knowledge()`)
+        the move waits up to knowledge_deadline seconds for it (forever if None) and is played at
+        random if the deadline passes.
+
         :param value: value of piece for CPU to place
         :param difficulty: influence the chance of the CPU playing a random move to adjust CPU difficulty;
-                           chance of random move will be (100 - difficulty)%
+                           chance of random move will be (100 - difficulty)%.
+                           If sampling_tables are set, the nearest difficulty level they were built for is used.
 
-        >>> np.random.seed(42)
-        >>> ttt = TicTacToe()
+        >>> ttt = TicTacToe(rng=RandomStream(42))
         >>> ttt.place_piece(1, (0, 0))
         >>> ttt.cpu_place_piece(2)
         >>> ttt.board
         array([[1, 0, 0],
-               [0, 0, 0],
-               [0, 2, 0]])
+               [0, 2, 0],
+               [0, 0, 0]])
         """
+        if self.sampling_tables is not None:
+            self._sampled_place_piece(value, difficulty)
+            return
+
         random_move_percent = 1 - difficulty / 100
-        if np.random.random() <= random_move_percent:
+        if self.rng.random() <= random_move_percent:
             self.place_random_piece(value=value)
             return
 
+        if self.policy_table is not None:
+            self._policy_place_piece(value)
+        elif self._await_knowledge(self.knowledge_deadline):
+            self._knowledge_place_piece(value)
+        else:
+            # Knowledge is still loading; fall back to a cheap move rather than keep User waiting
+            self.place_random_piece(value=value)
+
+    def _sampled_place_piece(self, value, difficulty):
+        """Place move sampled from sampling_tables at difficulty"""
+        sp_board = second_person_board(self.flat_board, value)
+        cell = self.sampling_tables.sample(board_to_code(sp_board), difficulty, self.rng)
+        if cell is None:
+            # Only reached if the board isn't reachable in a legal game
+            self.place_random_piece(value=value)
+        else:
+            self.place_piece(value=value, position=(cell % 3, cell // 3))
+
+    def _policy_place_piece(self, value):
+        """Place best ranked open move from policy_table"""
+        current_board = self.flat_board
+        sp_board = second_person_board(current_board, value)
+        for cell in self.policy_table[board_to_code(sp_board)].tolist():
+            if cell == NO_MOVE:
+                break
+
+            if current_board[cell] == '0':
+                self.place_piece(value=value, position=(cell % 3, cell // 3))
+                return
+
+        # Only reached if the board isn't reachable in a legal game
+        self.place_random_piece(value=value)
+
+    def _knowledge_place_piece(self, value):
+        """Place best known move from cpu_knowledge (or online_learner's latest snapshot)"""
+        if self.online_learner is None:
+            cpu_knowledge = self.cpu_knowledge
+        else:
+            cpu_knowledge = self.online_learner.snapshot
+
         current_board = self.flat_board
         fp_board = first_person_board(current_board, value)
         sp_board = second_person_board(current_board, value)
         try:
-            edges = self.cpu_knowledge.nodes[sp_board].edges
+            edges = cpu_knowledge.nodes[sp_board].edges
         # If move never seen before in knowledge
         except KeyError:
             self.place_random_piece(value=value)
@@ -279,12 +353,17 @@ class TicTacToe:
         # If no known moves available
         self.place_random_piece(value=value)
 
-    def train_cpu(self, n_rounds=5000, random_move_percent=0.25):
+    def train_cpu(self, n_rounds=5000, random_move_percent=0.25, progress_bar=True):
         """Train CPU AI to play against
 
+        Random choices are drawn from the rng attribute; pass a seeded `RandomStream` to `TicTacToe()`
+        to make training reproducible.
+
         :param n_rounds: Number of rounds for computer to play itself
         :param random_move_percent: Chance for CPU to make random choice rather than best known choice
-        :return: None; cpu_knowledge attribute will be modified
+        :param progress_bar: Should a tqdm progress bar be shown?
+        :return: None; cpu_knowledge attribute will be modified (including its edge_counts).
+                 If game_record attribute is set, each training game is written to it.
 
         >>> ttt = TicTacToe()
         >>> ttt.cpu_knowledge
@@ -298,15 +377,15 @@ class TicTacToe:
         # Player 1 will start
         player = 1
         count = 0
-        pbar = tqdm(desc='Training', total=n_rounds)
+        pbar = tqdm(desc='Training', total=n_rounds, disable=not progress_bar)
         while count < n_rounds:
             prev_move = self.flat_board
             # Place piece
             # Randomly decide to ignore knowledge and place randomly
-            if np.random.random() <= random_move_percent:
+            if self.rng.random() <= random_move_percent:
                 self.place_random_piece(value=player)
             else:
-                self.cpu_place_piece(player)
+                self._knowledge_place_piece(player)
             current_move = self.flat_board
 
             # Store move for player of interest
@@ -323,6 +402,10 @@ class TicTacToe:
             if self.game_is_over:
                 count += 1
                 pbar.update(1)
+                self._record_game()
+                for moves in game_knowledge:
+                    self.cpu_knowledge.count_edges((name, edge) for name, node in moves.nodes.items()
+                                                   for edge in node.edges)
                 if self.winner is not 0:  # 0 means a tie
                     winning_ind = self.winner - 1
                     winning_moves = game_knowledge[winning_ind]
@@ -351,14 +434,143 @@ class TicTacToe:
         pbar.close()
         self.reset_game()
 
+    def evaluate_cpu(self, n_games=200, rng=None):
+        """Play CPU's best known moves against a random player to measure CPU strength
+
+        CPU plays X in half the games and O in the other half.  Knowledge is not modified.
+
+        :param n_games: Number of evaluation games to play
+        :param rng: RandomStream for random moves; if None the rng attribute is used.
+                    Evaluations given identically seeded streams face the same random player,
+                    so differences between them come from changes in knowledge rather than chance.
+        :return: dict of CPU's win, draw, and loss rates
+
+        >>> ttt = TicTacToe(rng=RandomStream(42))
+        >>> sorted(ttt.evaluate_cpu(10).keys())
+        ['draw_rate', 'loss_rate', 'win_rate']
+        """
+        evaluator = TicTacToe(cpu_knowledge=self.cpu_knowledge, rng=self.rng if rng is None else rng)
+        results = {'win_rate': 0, 'draw_rate': 0, 'loss_rate': 0}
+        for i in range(n_games):
+            cpu = 1 if i % 2 == 0 else 2
+            player = 1
+            while not evaluator.game_is_over:
+                if player == cpu:
+                    evaluator._knowledge_place_piece(player)
+                else:
+                    evaluator.place_random_piece(player)
+                player = 1 if player == 2 else 2
+
+            if evaluator.winner == 0:
+                results['draw_rate'] += 1
+            elif evaluator.winner == cpu:
+                results['win_rate'] += 1
+            else:
+                results['loss_rate'] += 1
+
+            evaluator.reset_game()
+
+        return {k: v / n_games for k, v in results.items()}
+
+    def _best_known_moves(self):
+        """Map each position in cpu_knowledge to its highest weighted move"""
+        return {name: max(node.edges, key=node.edges.get)
+                for name, node in self.cpu_knowledge.nodes.items() if node.edges}
+
+    def train_until_converged(self, max_rounds=200000, eval_every=2000, eval_games=500, tolerance=0.02,
+                              patience=2, random_move_percent=0.5, min_random_move_percent=0.05,
+                              anneal=0.8, progress_bar=True):
+        """Train CPU AI until its play stops improving
+
+        Training is done in blocks of `eval_every` games.  After each block the CPU is evaluated
+        against a random player (see `TicTacToe.evaluate_cpu()`) and the share of known positions whose
+        best move changed since the last block is measured.  Training stops once win/draw rates and
+        the policy change are all within `tolerance` for `patience` blocks in a row.
+
+        Every evaluation replays the same seeded random player, and a change in win/draw rate only counts
+        if it is larger than both `tolerance` and two standard errors of the difference between
+        evaluations (~0.05 at 500 games), so noise alone doesn't decide when training stops.
+
+        The chance of random moves starts at `random_move_percent` and is multiplied by `anneal`
+        after every block until it reaches `min_random_move_percent`.
+
+        :param max_rounds: Max number of rounds for computer to play itself
+        :param eval_every: Number of training rounds between evaluations
+        :param eval_games: Number of games played for each evaluation
+        :param tolerance: Largest change in win rate, draw rate, or share of changed best moves
+                          between evaluations that counts as converged (rates are also allowed two
+                          standard errors of change)
+        :param patience: Number of converged evaluations in a row needed to stop
+        :param random_move_percent: Starting chance for CPU to make random choice rather than best known choice
+        :param min_random_move_percent: Lowest chance of random choice to anneal to
+        :param anneal: Factor to multiply chance of random choice by after each block
+        :param progress_bar: Should a tqdm progress bar be shown?
+        :return: list of dicts describing each evaluation; cpu_knowledge attribute will be modified
+
+        >>> ttt = TicTacToe(rng=RandomStream(42))
+        >>> history = ttt.train_until_converged(max_rounds=300, eval_every=100, eval_games=20, progress_bar=False)
+        >>> sorted(history[-1].keys())
+        ['draw_rate', 'loss_rate', 'n_rounds', 'policy_change', 'random_move_percent', 'win_rate']
+        >>> history[-1]['n_rounds'] <= 300
+        True
+        """
+        eval_seed = self.rng.choice(2 ** 31)
+        history = []
+        n_rounds = 0
+        n_converged = 0
+        prev_moves = self._best_known_moves()
+        prev_results = None
+
+        pbar = tqdm(desc='Training', total=max_rounds, disable=not progress_bar)
+        while n_rounds < max_rounds and n_converged < patience:
+            block = min(eval_every, max_rounds - n_rounds)
+            self.train_cpu(block, random_move_percent=random_move_percent, progress_bar=False)
+            n_rounds += block
+            pbar.update(block)
+
+            results = self.evaluate_cpu(eval_games, rng=RandomStream(eval_seed))
+            best_moves = self._best_known_moves()
+            n_changed = sum(prev_moves.get(name) != move for name, move in best_moves.items())
+            policy_change = n_changed / len(best_moves) if best_moves else 0
+
+            converged = prev_results is not None and policy_change <= tolerance and \
+                self._rate_converged(results['win_rate'], prev_results['win_rate'], eval_games, tolerance) and \
+                self._rate_converged(results['draw_rate'], prev_results['draw_rate'], eval_games, tolerance)
+            n_converged = n_converged + 1 if converged else 0
+
+            history.append(dict(results, n_rounds=n_rounds, random_move_percent=random_move_percent,
+                                policy_change=policy_change))
+            pbar.set_postfix(win=f"{results['win_rate']:.2f}", draw=f"{results['draw_rate']:.2f}",
+                             change=f'{policy_change:.3f}')
+
+            prev_moves = best_moves
+            prev_results = results
+            random_move_percent = max(min_random_move_percent, random_move_percent * anneal)
+
+        pbar.close()
+        return history
+
+    @staticmethod
+    def _rate_converged(rate, prev_rate, n_games, tolerance):
+        """Is change between two evaluated rates within tolerance or two standard errors?"""
+        std_err = np.sqrt((rate * (1 - rate) + prev_rate * (1 - prev_rate)) / n_games)
+        return abs(rate - prev_rate) <= max(tolerance, 2 * std_err)
+
     def _play_cli(self, cpu_difficulty=100):
-        """Play User vs CPU game(s) of TicTacToe via CLI
+        """Play User vs CPU game(s) of TicTacToe via CLI until User doesn't want to play again
 
         :param cpu_difficulty: influence the chance of the CPU playing a random move to adjust CPU difficulty;
                                chance of random move will be (100 - cpu_difficulty)%
         """
+        play_again = True
+        while play_again:
+            self._play_cli_game(cpu_difficulty=cpu_difficulty)
+            play_again = self.io.input('\nPlay again? (y or n): ').upper() == 'Y'
+
+    def _play_cli_game(self, cpu_difficulty=100):
+        """Play a single User vs CPU game of TicTacToe via CLI"""
         msg = '\nWhich piece would you like to be?\n(X or O; Xs will play first):\n'
-        player_piece = input(msg).strip().upper()
+        player_piece = self.io.input(msg).strip().upper()
         cpu_piece = 'O'
 
         if player_piece in ['O', '0']:
@@ -379,61 +591,202 @@ class TicTacToe:
         next_turn = {1: 2, 2: 1}
         while not self.game_is_over:
             turn_actions[turn]()
-            print(f'\n{self._piece_map[turn]} played:')
-            print(self)
+            self.io.output(f'\n{self._piece_map[turn]} played:')
+            self.io.output(str(self))
             turn = next_turn[turn]
-            time.sleep(0.3)
+            self.io.pause()
 
         try:
             display_winner = self._piece_map[self.winner]
         except KeyError:
             display_winner = 'No one'
-        print(f'Game Over. {display_winner} wins.')
+        self.io.output(f'Game Over. {display_winner} wins.')
 
+        self._record_game()
+        self._learn_from_game()
         self.reset_game()
 
-        while True:
-            play_again = input('\nPlay again? (y or n): ').upper() == 'Y'
-            if play_again:
-                self.play()
-            else:
-                break
+    def _learn_from_game(self):
+        """Hand finished game to online_learner (if any)
+
+        While knowledge is still loading the learner doesn't exist yet, so the game is queued and
+        handed over once loading finishes rather than making User wait for it.
+        """
+        self._unlearned_games.append((self.moves, self.winner))
+        if self._await_knowledge(timeout=0):
+            self._submit_unlearned_games()
+
+    def _submit_unlearned_games(self):
+        if self.online_learner is not None:
+            for moves, winner in self._unlearned_games:
+                self.online_learner.submit(moves, winner)
+
+        self._unlearned_games = []
 
     @staticmethod
     def _play_gui():
         raise NotImplementedError('Come back later...')
 
     def play(self, cpu_difficulty=100, use_saved_knowledge=True,
-             knowledge='cpu_knowledge.pickle', train_n_games=0, cli=True):
+             knowledge='cpu_knowledge.pickle', train_n_games=0, cli=True, record_games=None,
+             policy_table=None, online_learning=False, auto_train=False, knowledge_deadline=None,
+             compact_knowledge=False, smooth_difficulty=False):
         """Play User vs CPU game(s) of TicTacToe
 
         :param cpu_difficulty: influence the chance of the CPU playing a random move to adjust CPU difficulty;
                                chance of random move will be (100 - cpu_difficulty)%
         :param use_saved_knowledge: Should knowledge be read/saved to pickled file?
-        :param knowledge: Path to pickled file to read/save for CPU's knowledge.
+        :param knowledge: Path to pickled file (or binary knowledge file ending in '.tttk')
+                          to read/save for CPU's knowledge.
                           Ignored if use_saved_knowledge is False
         :param train_n_games: Number of games to add to CPU knowledge before playing User.
+                              If auto_train is True, this is the max number of games instead.
         :param cli: Should command line interface be used?
+        :param record_games: Path to binary game record file to append training and User games to.
+                             If None, games are not recorded.
+        :param policy_table: Path to policy table (.npy) for CPU to pick moves from instead of its knowledge.
+                             'default' uses the table shipped with the package.
+                             See `tictactoe.policy_table`.
+        :param online_learning: Should CPU learn from games against User while playing?
+                                Games are learned from in a background thread (see `tictactoe.online`).
+                                Learned knowledge is saved if use_saved_knowledge is True.
+        :param auto_train: Should CPU train until its play stops improving before playing User?
+                           See `TicTacToe.train_until_converged()`.
+        :param knowledge_deadline: Max seconds a CPU move waits for knowledge still loading (or training)
+                                   in the background before playing a random move instead.
+                                   If None, CPU moves wait until knowledge is loaded.
+        :param compact_knowledge: Should saved knowledge be loaded as a memory optimized CompactGraph?
+                                  See `tictactoe.compact_graph`.
+        :param smooth_difficulty: Should CPU sample moves from per difficulty tables instead of mixing in random
+                                  moves? See `tictactoe.sampling_tables`.
+                                  If True, tables are built from knowledge in the background once it is loaded
+                                  (they don't follow online learning); until they are built,
+                                  `TicTacToe.cpu_place_piece()` mixes in random moves as if this were False.
+                                  Otherwise a path to tables saved by `SamplingTables.save()` is read before play
+                                  starts; 'default' reads the tables shipped with the package.
         :return: None
         """
+        self.knowledge_deadline = knowledge_deadline
+        if policy_table is not None:
+            self.policy_table = load_policy_table(policy_table)
+
+        if isinstance(smooth_difficulty, (str, os.PathLike)):
+            self.sampling_tables = SamplingTables.load(smooth_difficulty)
+            smooth_difficulty = False
+
+        if record_games is not None:
+            self.game_record = GameRecordWriter(record_games)
+
+        try:
+            self._play(cpu_difficulty, use_saved_knowledge, knowledge, train_n_games, cli, online_learning,
+                       auto_train, compact_knowledge, smooth_difficulty)
+        finally:
+            if record_games is not None:
+                self.game_record.close()
+                self.game_record = None
+
+    def start_loading_knowledge(self, use_saved_knowledge=True, knowledge='cpu_knowledge.pickle',
+                                train_n_games=0, auto_train=False, online_learning=False, compact=False,
+                                sampling_tables=False):
+        """Read (and optionally train) CPU knowledge in a background thread
+
+        Training is done on a separate board, so games can be played while knowledge loads.
+        CPU moves wait for loading to finish (see `TicTacToe.cpu_place_piece()`).
+
+        :param use_saved_knowledge: Should knowledge be read/saved to file?
+        :param knowledge: Path to file to read/save for CPU's knowledge.
+        :param train_n_games: Number of games to add to CPU knowledge after reading it.
+                              If auto_train is True, this is the max number of games instead.
+        :param auto_train: Should CPU train until its play stops improving?
+        :param online_learning: Should an OnlineLearner be started from the loaded knowledge?
+        :param compact: Should saved knowledge be loaded as a memory optimized CompactGraph?
+        :param sampling_tables: Should SamplingTables be built from the loaded knowledge?
+        :return: concurrent.futures.Future of (cpu_knowledge, online_learner, sampling_tables)
+        """
+        trainer_rng = self.rng.spawn(1)[0]
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._knowledge_future = executor.submit(self._load_knowledge, use_saved_knowledge, knowledge,
+                                                 train_n_games, auto_train, online_learning, compact,
+                                                 sampling_tables, trainer_rng)
+        executor.shutdown(wait=False)
+
+        return self._knowledge_future
+
+    def _load_knowledge(self, use_saved_knowledge, knowledge, train_n_games, auto_train, online_learning, compact,
+                        sampling_tables, rng):
+        cpu_knowledge = self.cpu_knowledge
+
         # Read saved knowledge if it exists
         if use_saved_knowledge and os.path.exists(knowledge):
-            with open(knowledge, 'rb') as f:
-                self.cpu_knowledge = pickle.load(f)
+            cpu_knowledge = load_knowledge(knowledge, compact=compact)
 
-        if train_n_games > 0:
-            self.train_cpu(train_n_games)
+        if auto_train or train_n_games > 0:
+            trainer = TicTacToe(cpu_knowledge=cpu_knowledge, game_record=self.game_record, rng=rng)
+            if auto_train:
+                if train_n_games > 0:
+                    trainer.train_until_converged(max_rounds=train_n_games, progress_bar=False)
+                else:
+                    trainer.train_until_converged(progress_bar=False)
+            else:
+                trainer.train_cpu(train_n_games, progress_bar=False)
 
             # Save what CPU learned
             if use_saved_knowledge:
-                with open(knowledge, 'wb') as f:
-                    pickle.dump(self.cpu_knowledge, f, protocol=pickle.HIGHEST_PROTOCOL)
+                save_knowledge(cpu_knowledge, knowledge)
+
+        online_learner = OnlineLearner(cpu_knowledge).start() if online_learning else None
+        sampling_tables = SamplingTables.build(cpu_knowledge) if sampling_tables else None
+
+        return cpu_knowledge, online_learner, sampling_tables
+
+    def _await_knowledge(self, timeout=None):
+        """Wait for knowledge loading in the background (if any)
+
+        :param timeout: max seconds to wait; if None wait until loaded
+        :return: True if knowledge is loaded; False if timeout passed first
+        """
+        if self._knowledge_future is None:
+            return True
+
+        if timeout is None and not self._knowledge_future.done() and self.cli:
+            self.io.output('\nWaiting for CPU knowledge to load...')
+
+        try:
+            cpu_knowledge, online_learner, sampling_tables = self._knowledge_future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return False
+
+        self._knowledge_future = None
+        self.cpu_knowledge = cpu_knowledge
+        if online_learner is not None:
+            self.online_learner = online_learner
+        if sampling_tables is not None:
+            self.sampling_tables = sampling_tables
+
+        return True
+
+    def _play(self, cpu_difficulty, use_saved_knowledge, knowledge, train_n_games, cli, online_learning,
+              auto_train, compact_knowledge, smooth_difficulty):
+        self.start_loading_knowledge(use_saved_knowledge, knowledge, train_n_games, auto_train, online_learning,
+                                     compact_knowledge, smooth_difficulty)
 
         self.cli = cli
-        if cli:
-            self._play_cli(cpu_difficulty=cpu_difficulty)
-        else:
-            self._play_gui()
+        try:
+            if cli:
+                self._play_cli(cpu_difficulty=cpu_difficulty)
+            else:
+                self._play_gui()
+        finally:
+            # Training (if any) is saved by the loader, so let it finish
+            self._await_knowledge()
+            self._submit_unlearned_games()
+            if online_learning:
+                self.cpu_knowledge = self.online_learner.stop()
+                self.online_learner = None
+
+                # Save what CPU learned
+                if use_saved_knowledge:
+                    save_knowledge(self.cpu_knowledge, knowledge)
 
 
 if __name__ == '__main__':